@@ -1,10 +1,8 @@
 import pygame
-import csv
 import time
 import random
 import os
 import numpy as np
-import pandas as pd
 
 import lrc
 import tools
@@ -12,13 +10,25 @@ import mid2csv
 import settings_loader
 
 from video import VideoPlayer
-from particle import Particle, MicInputParticle
-from fft import RealtimeFFTPitchDetector
+from particle import ParticleSystem
+from fft import RealtimeFFTPitchDetector, WavReplayPitchDetector
 from framerecorder import PipeFrameRecorder
+from note_table import (
+    NoteTable,
+    PassedNoteCounter,
+    TYPE_NAMES,
+    TYPE_CODES,
+    EFFECT_BITS,
+    EFFECT_LISTS,
+    COUNT_CATEGORIES,
+    count_categories,
+)
+from page_index import PageIndex
+from mic_samples import MicSampleBuffer, add_mic_sample
+from mic_matcher import MicNoteMatcher
+from scoring import PageScoreEngine, split_pages, mic_page_rows
 from tools import get_lang_text_app, resource_path
 
-vec_mod12 = np.vectorize(tools.mod12_custom)
-
 
 class Mid2barPlayerApp:
     def __init__(
@@ -35,10 +45,21 @@ class Mid2barPlayerApp:
         title_image: str = None,
         enable_mic_input: bool = False,
         mic_input_channel: int = 0,
+        mic_replay_path: str = None,
         record: bool = False,
+        record_path: str = None,
+        headless: bool = False,
         settings_json_path: str = "settings.json",
         assets_json_path: str = "assets.json",
     ):
+        # Headless: no window and no sound device, run() renders the recording
+        self.headless = headless
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+            # Same video order and particles on every run
+            random.seed(0)
+
         pygame.init()
         pygame.mixer.init()
         pygame.display.set_caption("MID2BAR-Player")
@@ -54,13 +75,20 @@ class Mid2barPlayerApp:
         self.screen = pygame.Surface((self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT))
 
         if record:
-            self.recorder = PipeFrameRecorder()
+            self.recorder = PipeFrameRecorder(notify=not headless)
         else:
             self.recorder = None
-
-        separator_csv = f"./data/marker.csv"
-        note_csv = f"./data/note.csv"
-        mid2csv.convert(mid_path, note_csv, separator_csv)
+        self.record_path = record_path
+
+        midi_tables = mid2csv.convert_cached(mid_path)
+        if self.s.EXPORT_DEBUG_CSV:
+            mid2csv.write_csv(
+                midi_tables,
+                "./data/note.csv",
+                "./data/marker.csv",
+                "./data/text.csv",
+                "./data/tempo.csv",
+            )
 
         self.audio_path = audio_path
         self.video_start_time = None
@@ -73,6 +101,7 @@ class Mid2barPlayerApp:
         self.bar_auto_play = self.s.BAR_AUTO_PLAY
         self.enable_mic_input = enable_mic_input
         self.mic_input_channel = mic_input_channel
+        self.mic_replay_path = mic_replay_path
         self.music_volume = self.s.DEFAULT_VOLUME
 
         self.credit_text = credit_text
@@ -91,6 +120,8 @@ class Mid2barPlayerApp:
         self.bar_count_font = pygame.font.Font(
             self.s.BAR_COUNT_FONT, self.s.BAR_COUNT_FONT_SIZE
         )
+        self.text_cache = tools.TextSurfaceCache()
+        self.bar_cache = tools.BarSurfaceCache(max_size=512)
 
         # Init message
         self._flash_message(get_lang_text_app("generating subtitles"))
@@ -120,17 +151,34 @@ class Mid2barPlayerApp:
         # Basic variables
         self.audio_path = audio_path
         self.separators = []
-        self.notes = []
-        self.particles = []
-        self.mic_input_particles = []
-        self.bar_count_particles = []
+        self.notes = NoteTable()
+        self.particles = ParticleSystem()
+        self.mic_input_particles = ParticleSystem(
+            size_range=(5, 10), life_decay=0.05, colors=[(255, 255, 0)]
+        )
+        self.bar_count_particles = ParticleSystem(
+            size_range=(5, 8), life_decay=0.02, v=0.5
+        )
         self.bar_padding = 100
         self.pages = []
+        self.page_index = PageIndex([], [])
+        self.now_page_is = ()
+        self.page_layers = {}
+        self.free_layer_surfaces = []
+        self.page_work = pygame.Surface(
+            (self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT), pygame.SRCALPHA
+        )
+        self.page_work_rect = self.page_work.get_rect()
         self.page_scores = []
         self.scores = {}
-        self.mic_inputs_df = None
-        self.mic_notes = []
+        # Scores shown on the seek bar and their text
+        self.seekbar_scores = None
+        self.seekbar_score_str = ""
+        self.mic_inputs = MicSampleBuffer()
+        self.mic_notes = NoteTable()
         self.mic_pages = []
+        # Mic notes from this index on have no page layout yet
+        self.mic_layout_from = 0
 
         # Assets and video player
         from assets import Assets
@@ -153,9 +201,9 @@ class Mid2barPlayerApp:
         )
         self.menu_overlay.fill((0, 0, 0, 150))
 
-        # CSV
-        self.load_separator(separator_csv)
-        self.load_notes(note_csv)
+        # MIDI tables
+        self.load_separator(midi_tables["marker"])
+        self.load_notes(midi_tables["note"])
 
         # Audio
         sound = pygame.mixer.Sound(audio_path)
@@ -176,37 +224,60 @@ class Mid2barPlayerApp:
         self.seek_position = 0
 
         # Pitch range
-        pitches = [n["pitch"] for n in self.notes] if self.notes else [60, 84]
-        self.min_pitch = min(pitches)
-        self.max_pitch = max(pitches)
+        pitches = self.notes.pitch if len(self.notes) else np.array([60, 84])
+        self.min_pitch = int(pitches.min())
+        self.max_pitch = int(pitches.max())
         self.pitch_range = self.max_pitch - self.min_pitch
-        self.note_length_thre = np.percentile(
-            [n["end"] - n["start"] for n in self.notes], 90
-        )
+        self.note_length_thre = np.percentile(self.notes.end - self.notes.start, 90)
 
-        for i, note in enumerate(self.notes):
-            if note["pitch"] == self.max_pitch:
-                note["type"] = "max"
-            elif note["pitch"] == self.min_pitch:
-                note["type"] = "min"
-            else:
-                note["type"] = "normal"
+        self.notes.type[:] = np.select(
+            [self.notes.pitch == self.max_pitch, self.notes.pitch == self.min_pitch],
+            [TYPE_CODES["max"], TYPE_CODES["min"]],
+            TYPE_CODES["normal"],
+        )
 
-            note["effects"] = []
-            if (
-                i + 1 < len(self.notes)
-                and self.notes[i + 1]["pitch"] - self.notes[i]["pitch"]
-                >= self.pitch_range / 2
-            ):
-                note["effects"].append("up")
-            elif (
-                i + 1 < len(self.notes)
-                and self.notes[i + 1]["pitch"] - self.notes[i]["pitch"]
-                <= -self.pitch_range / 2
-            ):
-                note["effects"].append("down")
-            if note["end"] - note["start"] > self.note_length_thre:
-                note["effects"].append("long")
+        # Jump to the next note
+        pitch_diffs = np.diff(self.notes.pitch)
+        up = pitch_diffs >= self.pitch_range / 2
+        down = ~up & (pitch_diffs <= -self.pitch_range / 2)
+        effects = np.zeros(len(self.notes), dtype=np.uint8)
+        effects[:-1][up] |= EFFECT_BITS["up"]
+        effects[:-1][down] |= EFFECT_BITS["down"]
+        effects[
+            self.notes.end - self.notes.start > self.note_length_thre
+        ] |= EFFECT_BITS["long"]
+        self.notes.effects[:] = effects
+        # The jumps above are between neighbours in the order of the MIDI file
+        # (track by track), everything below goes by start time
+        self.notes.sort("start")
+
+        # Bar counters of auto play, in order of the time the notes are counted
+        auto_play_rows = np.flatnonzero(
+            np.isin(self.notes.channel, self.s.BAR_AUTO_PLAY_CHANNELS)
+        )
+        auto_play_rows = auto_play_rows[
+            np.argsort(self.notes.end[auto_play_rows], kind="stable")
+        ]
+        self.passed_counter = PassedNoteCounter()
+        self.passed_counter.extend(
+            self.notes.end[auto_play_rows]
+            + self.s.LAG_TIME
+            + self.s.BAR_PASSED_COUNT_ANIMATION_TIME,
+            count_categories(
+                self.notes, auto_play_rows, self.min_pitch, self.max_pitch
+            ),
+        )
+        self.mic_passed_counter = PassedNoteCounter()
+        self.mic_matcher = MicNoteMatcher(
+            self.notes,
+            np.flatnonzero(self.notes.channel == self.mic_input_channel),
+            self.mic_inputs,
+            self.mic_notes,
+            channel=self.mic_input_channel,
+            margin=self.s.MIC_INPUT_MARGIN,
+            connect_duration=self.s.MIC_INPUT_NOTE_CONNECT_DURATION,
+            tolerance=self.s.MIC_INPUT_PITCH_TOLERANCE,
+        )
 
         if (self.max_pitch - self.min_pitch) < self.s.DISPLAY_PITCH_RANGE_MIN:
             delta = (
@@ -241,17 +312,32 @@ class Mid2barPlayerApp:
 
         # Calc pages
         self.calc_pages()
+        self.score_engine = PageScoreEngine(
+            self.notes,
+            self.pages,
+            self.mic_input_channel,
+            self.s.PITCH_MATCH_SCORE_RATIO,
+            self.s.PITCH_ACCURACY_SCORE_RATIO,
+        )
 
         # Mic input
         if self.enable_mic_input:
-            self.detector = RealtimeFFTPitchDetector(
-                settings_json_path=self.setting_json_path
-            )
+            self.detector = self.create_detector()
             self.detector.start()
 
     # ---------- I/O / Initialize ----------
+    def create_detector(self):
+        if self.mic_replay_path:
+            # Recorded vocal in sync with the song instead of the microphone
+            return WavReplayPitchDetector(
+                self.setting_json_path,
+                self.mic_replay_path,
+                clock=lambda: self.current_time,
+            )
+        return RealtimeFFTPitchDetector(settings_json_path=self.setting_json_path)
+
     def _flash_message(self, text):
-        surf = self.font.render(text, True, (255, 255, 255))
+        surf = self.text_cache.render(self.font, text, (255, 255, 255))
         rect = surf.get_rect(
             center=(self.s.SCREEN_WIDTH // 2, self.s.SCREEN_HEIGHT // 2)
         )
@@ -259,149 +345,103 @@ class Mid2barPlayerApp:
         self.screen.blit(surf, rect)
         self.update_screen()
 
-    def load_separator(self, csv_path):
-        """separator.csv"""
-        with open(csv_path, "r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for i, row in enumerate(reader):
-                if i == 0:
-                    continue
-                section_id = int(row[0])
-                tick = int(row[1])
-                time_str = row[3]
-                time_sec = float(row[2])
-                self.separators.append(
-                    {
-                        "id": section_id,
-                        "tick": tick,
-                        "time_str": time_str,
-                        "time": time_sec,
-                    }
-                )
+    def load_separator(self, marker_table):
+        """Marker table of mid2csv"""
+        for section_id, (tick, time_sec, time_str) in enumerate(
+            zip(
+                marker_table["tick"].tolist(),
+                marker_table["time"].tolist(),
+                marker_table["time_str"].tolist(),
+            )
+        ):
+            self.separators.append(
+                {
+                    "id": section_id,
+                    "tick": tick,
+                    "time_str": time_str,
+                    "time": time_sec,
+                }
+            )
         if self.separators:
             last_time = self.separators[-1]["time"] + 10
             self.separators.append({"id": len(self.separators), "time": last_time})
 
-    def load_notes(self, csv_path):
-        """note.csv"""
-        with open(csv_path, "r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for i, row in enumerate(reader):
-                if i == 0:
-                    continue
-                note_id = int(row[0])
-                start_time = float(row[5])
-                end_time = float(row[6])
-                octave = int(row[7])
-                note_name = row[8]
-                pitch = int(row[9])
-                channel = int(row[10])
-                self.notes.append(
-                    {
-                        "id": note_id,
-                        "start": start_time,
-                        "end": end_time,
-                        "pitch": pitch,
-                        "octave": octave,
-                        "name": note_name,
-                        "channel": channel,
-                    }
-                )
+    def load_notes(self, note_table):
+        """Note table of mid2csv"""
+        self.notes = NoteTable.from_columns(
+            start=note_table["start"],
+            end=note_table["end"],
+            pitch=note_table["pitch"],
+            channel=note_table["channel"],
+        )
 
     # ---------- Pages ----------
+    def layout_page_notes(self, notes, rows, start_time, end_time):
+        """Compute x/y/width of `notes[rows]` in the page [start_time, end_time]"""
+        duration = end_time - start_time
+        notes.x_start[rows] = (
+            self.s.BAR_AREA_LEFT
+            + (notes.start[rows] - start_time) / duration * self.s.BAR_AREA_WIDTH
+        )
+        notes.x_end[rows] = (
+            self.s.BAR_AREA_LEFT
+            + (notes.end[rows] - start_time) / duration * self.s.BAR_AREA_WIDTH
+        )
+        notes.width[rows] = np.maximum(notes.x_end[rows] - notes.x_start[rows], 3)
+        notes.y[rows] = (
+            self.s.BAR_AREA_TOP
+            + self.s.BAR_AREA_HEIGHT
+            - (notes.pitch[rows] - self.display_min_pitch)
+            * self.s.BAR_AREA_HEIGHT
+            / (self.display_pitch_range - 1)
+        )
+
     def calc_pages_mic(self):
         if len(self.pages) == 0:
             return
 
-        self.mic_pages = []
-        for i in range(len(self.pages)):
-            start_time = self.pages[i]["start_time"]
-            end_time = self.pages[i]["end_time"]
-            duration = end_time - start_time
-            notes = [
-                n
-                for n in self.mic_notes
-                if start_time <= n["end"] and n["start"] <= end_time
+        if len(self.mic_pages) != len(self.pages):
+            self.mic_pages = [
+                {
+                    "start_time": page["start_time"],
+                    "end_time": page["end_time"],
+                    "notes": slice(0, 0),
+                }
+                for page in self.pages
             ]
+            self.mic_layout_from = 0
 
-            for note in notes:
-                x_start = (
-                    self.s.BAR_AREA_LEFT
-                    + (note["start"] - start_time) / duration * self.s.BAR_AREA_WIDTH
-                )
-                x_end = (
-                    self.s.BAR_AREA_LEFT
-                    + (note["end"] - start_time) / duration * self.s.BAR_AREA_WIDTH
-                )
-                width = max(x_end - x_start, 3)
-                y = (
-                    self.s.BAR_AREA_TOP
-                    + self.s.BAR_AREA_HEIGHT
-                    - (note["pitch"] - self.display_min_pitch)
-                    * self.s.BAR_AREA_HEIGHT
-                    / (self.display_pitch_range - 1)
-                )
-                height = self.bar_height
-
-                note.update(
-                    {
-                        "x_start": x_start,
-                        "x_end": x_end,
-                        "width": width,
-                        "height": height,
-                        "y": y,
-                    }
-                )
-
-            self.mic_pages.append(
-                {"start_time": start_time, "end_time": end_time, "notes": notes}
-            )
-
-    def calc_pages(self):
-        self.pages = []
-        for i in range(len(self.separators) - 1):
-            start_time = self.separators[i]["time"]
-            end_time = self.separators[i + 1]["time"]
-            duration = end_time - start_time
-            notes = [
-                n
-                for n in self.notes
-                if start_time - 1e-5 <= n["start"] < end_time
-                and end_time - n["start"] >= 1e-5
-            ]
-            if self.s.HIDE_NOW_BAR_WHEN_NO_NOTES and len(notes) == 0:
+        # Only the mic notes added or changed since the last frame are laid out
+        first = self.mic_layout_from
+        if first >= len(self.mic_notes):
+            return
+        mic_notes = self.mic_notes
+        first_start = mic_notes.start[first]
+        for mic_page in self.mic_pages:
+            start_time = mic_page["start_time"]
+            end_time = mic_page["end_time"]
+            if end_time < first_start:
                 continue
-
-            for note in notes:
-                x_start = (
-                    self.s.BAR_AREA_LEFT
-                    + (note["start"] - start_time) / duration * self.s.BAR_AREA_WIDTH
-                )
-                x_end = (
-                    self.s.BAR_AREA_LEFT
-                    + (note["end"] - start_time) / duration * self.s.BAR_AREA_WIDTH
-                )
-                width = max(x_end - x_start, 3)
-                y = (
-                    self.s.BAR_AREA_TOP
-                    + self.s.BAR_AREA_HEIGHT
-                    - (note["pitch"] - self.display_min_pitch)
-                    * self.s.BAR_AREA_HEIGHT
-                    / (self.display_pitch_range - 1)
-                )
-                height = self.bar_height
-                note.update(
-                    {
-                        "x_start": x_start,
-                        "x_end": x_end,
-                        "width": width,
-                        "height": height,
-                        "y": y,
-                    }
+            rows = mic_page_rows(mic_notes, start_time, end_time)
+            mic_page["notes"] = rows
+            if max(rows.start, first) < rows.stop:
+                self.layout_page_notes(
+                    mic_notes,
+                    slice(max(rows.start, first), rows.stop),
+                    start_time,
+                    end_time,
                 )
+        self.mic_layout_from = len(mic_notes)
 
-            self.pages.append(
-                {"start_time": start_time, "end_time": end_time, "notes": notes}
+    def calc_pages(self):
+        self.pages = split_pages(
+            self.notes,
+            [separator["time"] for separator in self.separators],
+            self.s.HIDE_NOW_BAR_WHEN_NO_NOTES,
+        )
+        for page in self.pages:
+            self.layout_page_notes(
+                self.notes, page["notes"], page["start_time"], page["end_time"]
             )
 
         # Fade in and out
@@ -424,243 +464,57 @@ class Mid2barPlayerApp:
             fade_in_time = max(0, self.pages[idx]["fade_in_time"] - self.s.FADE_TIME)
             self.pages[idx]["fade_in_time"] = fade_in_time
 
+        self.page_index = PageIndex(
+            [page["fade_in_time"] for page in self.pages],
+            [page["fade_out_time"] for page in self.pages],
+        )
+
     def get_current_page_i(self):
-        return [
-            i
-            for i, page in enumerate(self.pages)
-            if page["fade_in_time"] <= self.current_time < page["fade_out_time"]
-        ]
+        return self.page_index.lookup(self.current_time)
 
     def reset_mic_inputs(self):
-        self.mic_inputs_df = None
-        self.mic_notes = []
+        self.mic_inputs.clear()
+        self.mic_notes.clear()
         self.mic_pages = []
+        self.mic_layout_from = 0
+        self.mic_passed_counter.clear()
+        self.mic_matcher.reset()
+        self.score_engine.reset()
 
     def update_mic_inputs(self):
         if not self.enable_mic_input:
             return
 
-        mic_pitch = self.detector.get_latest()
-        current_time_delay = self.current_time - self.s.MIC_INPUT_DELAY
-        if mic_pitch["rms"] >= self.s.RMS_THRESHOLD and mic_pitch["midi"] is not None:
-            data = [
-                {
-                    "time": current_time_delay,
-                    "pitch": mic_pitch["midi"],
-                    "octave": mic_pitch["octave"],
-                    "name": mic_pitch["note_name"],
-                    "channel": 0,
-                }
-            ]
-            if self.mic_inputs_df is None:
-                self.mic_inputs_df = pd.DataFrame(data)
-            else:
-                self.mic_inputs_df = pd.concat(
-                    [self.mic_inputs_df, pd.DataFrame(data)], axis=0
-                )
-
-            return self.mic_inputs_df.iloc[-1].to_dict()
+        add_mic_sample(
+            self.mic_inputs,
+            self.detector.get_latest(),
+            self.current_time - self.s.MIC_INPUT_DELAY,
+            self.s.RMS_THRESHOLD,
+        )
 
     def update_mic_notes(self):
-        if not self.enable_mic_input or self.mic_inputs_df is None:
+        if not self.enable_mic_input:
             return
 
-        target_notes = [
-            n
-            for n in self.notes
-            if n["start"] <= self.current_time - self.s.MIC_INPUT_DELAY
-            and n["channel"] == self.mic_input_channel
-        ]
-
-        for i in range(len(target_notes)):
-            if len(self.mic_notes) > 0:
-                if self.mic_notes[-1]["end"] >= target_notes[i]["end"]:
-                    continue
-
-            start = target_notes[i]["start"]
-            end = target_notes[i]["end"]
-            target_pitch = target_notes[i]["pitch"]
-
-            _matched = self.mic_inputs_df.loc[
-                (self.mic_inputs_df["time"] >= start - self.s.MIC_INPUT_MARGIN)
-                & (self.mic_inputs_df["time"] <= end + self.s.MIC_INPUT_MARGIN)
-            ]
-            if len(_matched) == 0:
-                continue
-
-            split_times = tools.split_range(
-                start, end, self.s.MIC_INPUT_NOTE_CONNECT_DURATION
-            )
-            n = 0
-            for j, (_start, _end) in enumerate(split_times):
-                matched = self.mic_inputs_df.loc[
-                    (self.mic_inputs_df["time"] >= _start - self.s.MIC_INPUT_MARGIN)
-                    & (self.mic_inputs_df["time"] <= _end + self.s.MIC_INPUT_MARGIN)
-                ]
-                if len(matched) > 0:
-                    pitch_diffs = vec_mod12(matched["pitch"].to_numpy() - target_pitch)
-                    input_pitch = np.mean(pitch_diffs) + target_pitch
-                else:
-                    input_pitch = -j
-
-                modi_pitch = tools.round_pitch(
-                    input_pitch, target_pitch, self.s.MIC_INPUT_PITCH_TOLERANCE
-                )
-
-                if (
-                    len(self.mic_notes) > 0
-                    and len(split_times) > 1
-                    and j > 0
-                    and self.mic_notes[-1]["pitch"] == modi_pitch
-                ):
-                    self.mic_notes[-1]["end"] = _end
-                    if (
-                        j == len(split_times) - 1
-                        and n == 0
-                        and self.mic_notes[-1]["start"] == start
-                        and modi_pitch == target_pitch
-                    ):
-                        # Full matched
-                        self.mic_notes[-1]["type"] = "match_all"
-                        self.mic_notes[-1]["efffects"] = target_notes[i]["effects"]
-
-                elif input_pitch > 0:
-                    if len(split_times) == 1 and target_pitch == modi_pitch:
-                        typ = "match_all"
-                        effects = target_notes[i]["effects"]
-                    elif target_pitch == modi_pitch:
-                        typ = "match"
-                        effects = []
-                    else:
-                        typ = "unmatch"
-                        effects = []
-
-                    if len(self.mic_notes) == 0 or self.mic_notes[-1]["end"] <= _start:
-                        self.mic_notes.append(
-                            {
-                                "start": _start,
-                                "end": _end,
-                                "pitch": modi_pitch,
-                                "pitch_org": input_pitch,
-                                "channel": self.mic_input_channel,
-                                "type": typ,
-                                "effects": effects,
-                            }
-                        )
-                        n += 1
+        changed = self.mic_matcher.update(self.current_time - self.s.MIC_INPUT_DELAY)
+        self.mic_layout_from = min(self.mic_layout_from, changed)
+        self.score_engine.invalidate_from(changed)
 
     # ---------- Real-time scoring ---------
     def compute_note_scores(self):
-        if self.enable_mic_input:
-            pages = []
-            for p in self.pages:
-                pages.append(
-                    {
-                        "start_time": p["start_time"],
-                        "end_time": p["end_time"],
-                        "duration": p["end_time"] - p["start_time"],
-                        "notes": [
-                            n
-                            for n in p["notes"]
-                            if n["channel"] == self.mic_input_channel
-                        ],
-                    }
-                )
-
-            mic_pages = self.mic_pages.copy()
-
-            page_scores = []
-            for page, mic_page in zip(pages, mic_pages):
-                notes = page["notes"]
-                mic_notes = mic_page["notes"]
-
-                mic_starts = np.array([m["start"] for m in mic_notes], dtype=np.float64)
-                mic_ends = np.array([m["end"] for m in mic_notes], dtype=np.float64)
-                mic_pitches = np.array(
-                    [m["pitch"] for m in mic_notes], dtype=np.float64
-                )
-                mic_pitch_org = np.array(
-                    [m.get("pitch_org", m["pitch"]) for m in mic_notes],
-                    dtype=np.float64,
-                )
-
-                mic_abs_diff = np.abs(mic_pitch_org - mic_pitches)
-                mic_score_raw = np.where(
-                    mic_abs_diff >= 6.0, 0.0, (6.0 - mic_abs_diff) / 6.0
-                )
-
-                for note in notes:
-                    n_start = float(note["start"])
-                    n_end = float(note["end"])
-                    n_pitch = float(note["pitch"])
-                    note_duration = max(0.0, n_end - n_start)
-                    note["duration"] = note_duration
-                    if note_duration <= 0.0:
-                        note["match_ratio"] = 0.0
-                        note["pitch_accuracy"] = 0.0
-                        continue
-
-                    overlap = np.minimum(n_end, mic_ends) - np.maximum(
-                        n_start, mic_starts
-                    )
-                    overlap = np.maximum(overlap, 0.0)
-
-                    mask = overlap > 0.0
-                    total_overlap = overlap[mask].sum()
-
-                    if total_overlap == 0.0:
-                        note["match_ratio"] = 0.0
-                        note["pitch_accuracy"] = 0.0
-                        continue
-
-                    equal_mask = (mic_pitches == n_pitch) & mask
-                    equal_time = overlap[equal_mask].sum() if equal_mask.any() else 0.0
-                    note["match_ratio"] = float(equal_time / note_duration)
-
-                    scores = mic_score_raw[mask]
-                    weights = overlap[mask]
-                    weighted_score = (
-                        float((scores * weights).sum() / weights.sum())
-                        if weights.sum() > 0.0
-                        else 0.0
-                    )
-                    note["pitch_accuracy"] = float(max(0.0, min(1.0, weighted_score)))
-
-                note_duration_weights = np.array([m["duration"] for m in notes])
-                if len(note_duration_weights) > 0:
-                    score_pitch_match = (
-                        np.average(
-                            [m["match_ratio"] for m in notes],
-                            weights=note_duration_weights,
-                        )
-                        * 100
-                    )
-                    score_pitch_accuracy = (
-                        np.average(
-                            [m["pitch_accuracy"] for m in notes],
-                            weights=note_duration_weights,
-                        )
-                        * 100
-                    )
-                else:
-                    score_pitch_match = 0.0
-                    score_pitch_accuracy = 0.0
-
-                page_scores.append(
-                    {
-                        "number_of_notes": len(notes),
-                        "start_time": page["start_time"],
-                        "end_time": page["end_time"],
-                        "duration": page["duration"],
-                        "pitch_match": score_pitch_match,
-                        "pitch_accuracy": score_pitch_accuracy,
-                        "weighted_score": self.s.PITCH_MATCH_SCORE_RATIO
-                        * score_pitch_match
-                        + self.s.PITCH_ACCURACY_SCORE_RATIO * score_pitch_accuracy,
-                    }
-                )
+        if not self.enable_mic_input:
+            return
 
-            self.page_scores = page_scores
+        engine = self.score_engine
+        if (
+            engine.last_update_time is not None
+            and 0
+            <= self.current_time - engine.last_update_time
+            < self.s.SCORE_UPDATE_INTERVAL
+        ):
+            return
+        engine.update(self.mic_notes, self.mic_pages, self.current_time)
+        self.page_scores = engine.page_scores
 
     # ---------- Drawing helpers ----------
     def draw_background_lines(self):
@@ -680,7 +534,7 @@ class Mid2barPlayerApp:
                 self.screen.blit(sur, (0, int(y)))
 
     def draw_now_bar(self):
-        now_page_is = self.get_current_page_i()
+        now_page_is = self.now_page_is
         if not now_page_is:
             return
         now_page = self.pages[now_page_is[0]]
@@ -696,172 +550,301 @@ class Mid2barPlayerApp:
         x -= self.s.NOW_BAR_WIDTH / 2
         self.screen.blit(self.assets.scaled_now_bar, (x, self.s.NOW_BAR_TOP))
 
+    # ---------- Page layers ----------
+    def get_page_layer(self, page_i):
+        """Back bars and range gauge of a page, rendered when the page appears.
+
+        In demo mode the bars of the passed notes are added to the layer
+        as the notes pass (see `bake_passed_notes`).
+        """
+        layer = self.page_layers.get(page_i)
+        if layer is None:
+            if self.free_layer_surfaces:
+                surface = self.free_layer_surfaces.pop()
+            else:
+                surface = pygame.Surface(
+                    (self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT), pygame.SRCALPHA
+                )
+            layer = {"surface": surface, "rect": None, "passed": None}
+            self.page_layers[page_i] = layer
+            self.render_page_layer(page_i, layer)
+        return layer
+
+    def release_page_layers(self):
+        for page_i in list(self.page_layers):
+            if page_i not in self.now_page_is:
+                layer = self.page_layers.pop(page_i)
+                layer["surface"].fill((0, 0, 0, 0), layer["rect"])
+                self.free_layer_surfaces.append(layer["surface"])
+
+    def render_page_layer(self, page_i, layer):
+        surface = layer["surface"]
+        if layer["rect"] is not None:
+            surface.fill((0, 0, 0, 0), layer["rect"])
+
+        page_notes = self.pages[page_i]["notes"]
+        rects = [pygame.Rect(0, 0, 0, 0)]
+        for x_start, y, width, channel, typ in self.notes.rows(
+            page_notes, "x_start", "y", "width", "channel", "type"
+        ):
+            bars = self.assets.bars[channel][TYPE_NAMES[typ]]
+            rects.append(
+                self.bar_cache.draw(
+                    surface,
+                    int(x_start),
+                    int(y - self.bar_height / 2),
+                    int(width),
+                    int(self.bar_height),
+                    bars["back_left"],
+                    bars["back_mid"],
+                    bars["back_right"],
+                    self.bar_padding,
+                )
+            )
+
+        # Range gauge
+        page_pitches = self.notes.pitch[page_notes]
+        if len(page_pitches) > 0:
+            x1 = (
+                (np.min(page_pitches) - self.min_pitch)
+                / (self.pitch_range)
+                * self.s.RANGE_GAUGE_W
+            )
+            x2 = (
+                (np.max(page_pitches) - self.min_pitch)
+                / (self.pitch_range)
+                * self.s.RANGE_GAUGE_W
+            )
+            range_gauge = self.assets.range_gauge.subsurface(
+                pygame.Rect(x1, 0, x2 - x1, self.s.RANGE_GAUGE_H)
+            )
+            rects.append(
+                surface.blit(
+                    range_gauge,
+                    (self.s.RANGE_GAUGE_POS[0] + x1, self.s.RANGE_GAUGE_POS[1]),
+                )
+            )
+
+        layer["rect"] = rects[0].unionall(rects[1:])
+        layer["passed"] = np.zeros(page_notes.stop - page_notes.start, dtype=bool)
+
+    def bake_passed_notes(self, page_i, layer, passed):
+        """Add the passed bars and their icons of newly passed notes to the layer"""
+        if (layer["passed"] & ~passed).any():
+            # Rewound or auto play turned off
+            self.render_page_layer(page_i, layer)
+
+        page_notes = self.pages[page_i]["notes"]
+        rows = page_notes.start + np.flatnonzero(passed & ~layer["passed"])
+        rects = [layer["rect"]]
+        for x_start, x_end, y, width, channel, typ, effects in self.notes.rows(
+            rows, "x_start", "x_end", "y", "width", "channel", "type", "effects"
+        ):
+            bars = self.assets.bars[channel][TYPE_NAMES[typ]]
+            rects.append(
+                self.bar_cache.draw(
+                    layer["surface"],
+                    int(x_start),
+                    int(y - self.bar_height / 2),
+                    int(width),
+                    int(self.bar_height),
+                    bars["passed_left"],
+                    bars["passed_mid"],
+                    bars["passed_right"],
+                    self.bar_padding,
+                )
+            )
+            for i, effect in enumerate(EFFECT_LISTS[effects]):
+                px = x_end - (i + 1) * self.s.BAR_PASSED_COUNT_ICON_SIZE
+                py = y - (
+                    self.s.BAR_PASSED_COUNT_ICON_SIZE
+                    + self.s.BAR_PASSED_COUNT_ICON_MARGIN
+                )
+                rects.append(layer["surface"].blit(self.assets.icons[effect], (px, py)))
+
+        layer["rect"] = rects[0].unionall(rects[1:])
+        layer["passed"] = passed
+
+    def begin_page_composite(self, layer):
+        """Work surface holding the page layer, to draw the changing parts on.
+
+        Only the rects drawn to in the previous frame are cleared, and only
+        the rects drawn to in this frame are blitted to the screen.
+        """
+        self.page_work.fill((0, 0, 0, 0), self.page_work_rect)
+        self.page_work.blit(
+            layer["surface"],
+            layer["rect"],
+            layer["rect"],
+            special_flags=pygame.BLEND_RGBA_MAX,
+        )
+        return self.page_work
+
+    def end_page_composite(self, layer, dirty_rects, alpha, crop_bbox):
+        self.page_work_rect = layer["rect"].unionall(dirty_rects)
+        self.page_work.set_alpha(alpha)
+        area = self.page_work_rect.clip(pygame.Rect(*crop_bbox))
+        self.screen.blit(self.page_work, area, area)
+
+    def page_fade(self, page):
+        """Alpha and crop rect of a page fading in or out"""
+        start_time_delta = self.current_time - page["fade_in_time"]
+        end_time_delta = self.current_time - page["fade_out_time"]
+
+        if start_time_delta <= self.s.FADE_TIME:
+            display_width = (
+                self.s.BAR_AREA_WIDTH * min(start_time_delta / self.s.FADE_TIME, 1)
+                + self.s.BAR_AREA_LEFT
+            )
+            alpha = int(min(start_time_delta / self.s.FADE_TIME, 1) * 255)
+            crop_bbox = [0, 0, display_width, self.s.SCREEN_HEIGHT]
+        elif end_time_delta >= -self.s.FADE_TIME:
+            display_width = (
+                self.s.BAR_AREA_WIDTH * min(-end_time_delta / self.s.FADE_TIME, 1)
+                + self.s.BAR_AREA_LEFT
+            )
+            alpha = int(min(-end_time_delta / self.s.FADE_TIME, 1) * 255)
+            crop_bbox = [
+                self.s.SCREEN_WIDTH - display_width,
+                0,
+                display_width,
+                self.s.SCREEN_HEIGHT,
+            ]
+        else:
+            alpha = 255
+            crop_bbox = [0, 0, self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT]
+
+        return alpha, crop_bbox
+
     def draw_notes(self):
+        self.release_page_layers()
+
         if self.enable_mic_input:
             # ===== Mic input =====
             self.update_mic_inputs()
             self.update_mic_notes()
             self.calc_pages_mic()
 
-            now_page_is = self.get_current_page_i()
+            now_page_is = self.now_page_is
             for now_page_i in now_page_is:
-                screen_note = pygame.Surface(
-                    (self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT), pygame.SRCALPHA
-                )
                 now_page = self.pages[now_page_i]
-                now_page_notes = now_page["notes"]
+                alpha, crop_bbox = self.page_fade(now_page)
 
-                fade_in_time = now_page["fade_in_time"]
-                fade_out_time = now_page["fade_out_time"]
-
-                start_time_delta = self.current_time - fade_in_time
-                end_time_delta = self.current_time - fade_out_time
-
-                if start_time_delta <= self.s.FADE_TIME:
-                    display_width = (
-                        self.s.BAR_AREA_WIDTH
-                        * min(start_time_delta / self.s.FADE_TIME, 1)
-                        + self.s.BAR_AREA_LEFT
-                    )
-                    alpha = int(min(start_time_delta / self.s.FADE_TIME, 1) * 255)
-                    crop_bbox = [0, 0, display_width, self.s.SCREEN_HEIGHT]
-                elif end_time_delta >= -self.s.FADE_TIME:
-                    display_width = (
-                        self.s.BAR_AREA_WIDTH
-                        * min(-end_time_delta / self.s.FADE_TIME, 1)
-                        + self.s.BAR_AREA_LEFT
-                    )
-                    alpha = int(min(-end_time_delta / self.s.FADE_TIME, 1) * 255)
-                    crop_bbox = [
-                        self.s.SCREEN_WIDTH - display_width,
-                        0,
-                        display_width,
-                        self.s.SCREEN_HEIGHT,
-                    ]
-                else:
-                    alpha = 255
-                    crop_bbox = [0, 0, self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT]
-
-                for note in now_page_notes:
-                    tools.draw_stretchable_rounded_rect(
-                        screen_note,
-                        int(note["x_start"]),
-                        int(note["y"] - note["height"] / 2),
-                        int(note["width"]),
-                        int(note["height"]),
-                        self.assets.bars[note["channel"]][note["type"]]["back_left"],
-                        self.assets.bars[note["channel"]][note["type"]]["back_mid"],
-                        self.assets.bars[note["channel"]][note["type"]]["back_right"],
-                        self.bar_padding,
-                    )
+                layer = self.get_page_layer(now_page_i)
+                self.bake_passed_notes(
+                    now_page_i, layer, np.zeros_like(layer["passed"])
+                )
+                screen_note = self.begin_page_composite(layer)
+                dirty_rects = []
 
                 now_page_mic_notes = self.mic_pages[now_page_i]["notes"]
-                for note in now_page_mic_notes:
-                    tools.draw_stretchable_rounded_rect(
-                        screen_note,
-                        int(note["x_start"]),
-                        int(note["y"] - note["height"] / 2),
-                        int(note["width"]),
-                        int(note["height"]),
-                        self.assets.bars[note["channel"]][note["type"]]["passed_left"],
-                        self.assets.bars[note["channel"]][note["type"]]["passed_mid"],
-                        self.assets.bars[note["channel"]][note["type"]]["passed_right"],
-                        self.bar_padding,
+                for (
+                    start,
+                    end,
+                    x_start,
+                    x_end,
+                    y,
+                    width,
+                    channel,
+                    typ,
+                    effects,
+                ) in self.mic_notes.rows(
+                    now_page_mic_notes,
+                    "start",
+                    "end",
+                    "x_start",
+                    "x_end",
+                    "y",
+                    "width",
+                    "channel",
+                    "type",
+                    "effects",
+                ):
+                    typ = TYPE_NAMES[typ]
+                    bars = self.assets.bars[channel][typ]
+                    dirty_rects.append(
+                        self.bar_cache.draw(
+                            screen_note,
+                            int(x_start),
+                            int(y - self.bar_height / 2),
+                            int(width),
+                            int(self.bar_height),
+                            bars["passed_left"],
+                            bars["passed_mid"],
+                            bars["passed_right"],
+                            self.bar_padding,
+                        )
                     )
                     if (
-                        note["type"] in ["match", "match_all"]
+                        typ in ["match", "match_all"]
                         and random.random() < self.s.BAR_PASSED_PARTICLE_RAND
                     ):
-                        px = random.uniform(note["x_start"], note["x_end"])
-                        py = note["y"]
-                        self.particles.append(Particle(px, py))
-
-                    playing = (
-                        note["start"]
-                        <= self.current_time - self.s.MIC_INPUT_DELAY
-                        <= note["end"]
-                    )
+                        px = random.uniform(x_start, x_end)
+                        py = y
+                        self.particles.emit(px, py)
+
+                    playing = start <= self.current_time - self.s.MIC_INPUT_DELAY <= end
                     if playing:
                         px = self.now_bar_x
                         py = random.uniform(
-                            note["y"] - self.bar_height / 4,
-                            note["y"] + self.bar_height / 4,
+                            y - self.bar_height / 4,
+                            y + self.bar_height / 4,
                         )
-                        self.mic_input_particles.append(MicInputParticle(px, py))
+                        self.mic_input_particles.emit(px, py)
 
                     # Impact draw effects
-                    passed_time = self.current_time - note["end"]
-                    if (
-                        passed_time <= self.s.BAR_GLOW_DURATION
-                        and note["type"] == "match_all"
-                    ):
+                    passed_time = self.current_time - end
+                    if passed_time <= self.s.BAR_GLOW_DURATION and typ == "match_all":
                         a = (
                             self.s.BAR_GLOW_DURATION - passed_time
                         ) / self.s.BAR_GLOW_DURATION
                         scale = (1 - a) * (self.s.BAR_GLOW_SCALE - 1) + 1
-                        scaled_w = note["width"] * scale
-                        scaled_h = note["height"] * scale
+                        scaled_w = width * scale
+                        scaled_h = self.bar_height * scale
 
-                        x_diff = (scaled_w - note["width"]) / 2
-                        y_diff = (scaled_h - note["height"]) / 2
+                        x_diff = (scaled_w - width) / 2
+                        y_diff = (scaled_h - self.bar_height) / 2
                         bar_glow = pygame.transform.smoothscale(
-                            self.assets.bars[note["channel"]][note["type"]]["glow"],
-                            (scaled_w, scaled_h),
+                            bars["glow"], (scaled_w, scaled_h)
                         )
                         bar_glow.set_alpha(int(a * 255))
-                        screen_note.blit(
-                            bar_glow,
-                            (
-                                note["x_start"] - x_diff,
-                                note["y"] - note["height"] / 2 - y_diff,
-                            ),
+                        dirty_rects.append(
+                            screen_note.blit(
+                                bar_glow,
+                                (
+                                    x_start - x_diff,
+                                    y - self.bar_height / 2 - y_diff,
+                                ),
+                            )
                         )
 
                     # Icons
-                    for i, effect in enumerate(note["effects"]):
-                        px = note["x_end"] - (i + 1) * self.s.BAR_PASSED_COUNT_ICON_SIZE
-                        py = note["y"] - (
+                    for i, effect in enumerate(EFFECT_LISTS[effects]):
+                        px = x_end - (i + 1) * self.s.BAR_PASSED_COUNT_ICON_SIZE
+                        py = y - (
                             self.s.BAR_PASSED_COUNT_ICON_SIZE
                             + self.s.BAR_PASSED_COUNT_ICON_MARGIN
                         )
-                        screen_note.blit(self.assets.icons[effect], (px, py))
-
-                # Range gauges
-                x1 = (
-                    (
-                        np.min([note["pitch"] for note in now_page_notes])
-                        - self.min_pitch
-                    )
-                    / (self.pitch_range)
-                    * self.s.RANGE_GAUGE_W
-                )
-                x2 = (
-                    (
-                        np.max([note["pitch"] for note in now_page_notes])
-                        - self.min_pitch
-                    )
-                    / (self.pitch_range)
-                    * self.s.RANGE_GAUGE_W
-                )
-                range_gauge = self.assets.range_gauge.subsurface(
-                    pygame.Rect(x1, 0, x2 - x1, self.s.RANGE_GAUGE_H)
-                )
-                screen_note.blit(
-                    range_gauge,
-                    (self.s.RANGE_GAUGE_POS[0] + x1, self.s.RANGE_GAUGE_POS[1]),
-                )
+                        dirty_rects.append(
+                            screen_note.blit(self.assets.icons[effect], (px, py))
+                        )
 
                 # Finalize
-                screen_note.set_alpha(alpha)
-                screen_note_crop = screen_note.subsurface(pygame.Rect(*crop_bbox))
-                self.screen.blit(screen_note_crop, (crop_bbox[0], 0))
+                self.end_page_composite(layer, dirty_rects, alpha, crop_bbox)
 
             if len(now_page_is) > 0:
                 for i in range(max(min(now_page_is) - 1, 0), max(now_page_is) + 1):
-                    notes = self.mic_pages[i]["notes"]
-                    for note in notes:
-                        if note["type"] == "match_all":
-                            passed_time = self.current_time - note["end"]
+                    for end, x_end, y, pitch, typ, effects in self.mic_notes.rows(
+                        self.mic_pages[i]["notes"],
+                        "end",
+                        "x_end",
+                        "y",
+                        "pitch",
+                        "type",
+                        "effects",
+                    ):
+                        if typ == TYPE_CODES["match_all"]:
+                            passed_time = self.current_time - end
                             if passed_time >= 0:
                                 # Count particles
                                 if (
@@ -873,10 +856,10 @@ class Mid2barPlayerApp:
                                         passed_time
                                         / self.s.BAR_PASSED_COUNT_ANIMATION_TIME
                                     )
-                                    pos0 = (note["x_end"], note["y"])
-                                    if note["pitch"] == self.max_pitch:
+                                    pos0 = (x_end, y)
+                                    if pitch == self.max_pitch:
                                         note_typ = "max"
-                                    elif note["pitch"] == self.min_pitch:
+                                    elif pitch == self.min_pitch:
                                         note_typ = "min"
                                     else:
                                         note_typ = "normal"
@@ -894,18 +877,11 @@ class Mid2barPlayerApp:
                                         self.s.BAR_PASSED_COUNT_ANIMATION_ACCEL,
                                     )
 
-                                    self.bar_count_particles.append(
-                                        Particle(
-                                            pos[0],
-                                            pos[1],
-                                            size_range=(5, 8),
-                                            life_decay=0.02,
-                                            colors=col,
-                                            v=0.5,
-                                        )
+                                    self.bar_count_particles.emit(
+                                        pos[0], pos[1], colors=col
                                     )
 
-                                    for effect in note["effects"]:
+                                    for effect in EFFECT_LISTS[effects]:
                                         pos1 = self.s.BAR_PASSED_COUNT_ANIMATION_DICT[
                                             effect
                                         ]["pos"]
@@ -920,142 +896,93 @@ class Mid2barPlayerApp:
                                             self.s.BAR_PASSED_COUNT_ANIMATION_ACCEL,
                                         )
 
-                                        self.bar_count_particles.append(
-                                            Particle(
-                                                pos[0],
-                                                pos[1],
-                                                size_range=(5, 8),
-                                                life_decay=0.02,
-                                                colors=col,
-                                                v=0.5,
-                                            )
+                                        self.bar_count_particles.emit(
+                                            pos[0], pos[1], colors=col
                                         )
-
         else:
             # ===== Demo =====
-            now_page_is = self.get_current_page_i()
+            now_page_is = self.now_page_is
             for now_page_i in now_page_is:
-                screen_note = pygame.Surface(
-                    (self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT), pygame.SRCALPHA
-                )
                 now_page = self.pages[now_page_i]
                 now_page_notes = now_page["notes"]
+                if now_page_notes.stop == now_page_notes.start:
+                    continue
+                alpha, crop_bbox = self.page_fade(now_page)
 
-                fade_in_time = now_page["fade_in_time"]
-                fade_out_time = now_page["fade_out_time"]
-
-                start_time_delta = self.current_time - fade_in_time
-                end_time_delta = self.current_time - fade_out_time
-
-                if start_time_delta <= self.s.FADE_TIME:
-                    display_width = (
-                        self.s.BAR_AREA_WIDTH
-                        * min(start_time_delta / self.s.FADE_TIME, 1)
-                        + self.s.BAR_AREA_LEFT
-                    )
-                    alpha = int(min(start_time_delta / self.s.FADE_TIME, 1) * 255)
-                    crop_bbox = [0, 0, display_width, self.s.SCREEN_HEIGHT]
-                elif end_time_delta >= -self.s.FADE_TIME:
-                    display_width = (
-                        self.s.BAR_AREA_WIDTH
-                        * min(-end_time_delta / self.s.FADE_TIME, 1)
-                        + self.s.BAR_AREA_LEFT
-                    )
-                    alpha = int(min(-end_time_delta / self.s.FADE_TIME, 1) * 255)
-                    crop_bbox = [
-                        self.s.SCREEN_WIDTH - display_width,
-                        0,
-                        display_width,
-                        self.s.SCREEN_HEIGHT,
-                    ]
-                else:
-                    alpha = 255
-                    crop_bbox = [0, 0, self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT]
-
-                for note in now_page_notes:
-                    tools.draw_stretchable_rounded_rect(
-                        screen_note,
-                        int(note["x_start"]),
-                        int(note["y"] - note["height"] / 2),
-                        int(note["width"]),
-                        int(note["height"]),
-                        self.assets.bars[note["channel"]][note["type"]]["back_left"],
-                        self.assets.bars[note["channel"]][note["type"]]["back_mid"],
-                        self.assets.bars[note["channel"]][note["type"]]["back_right"],
-                        self.bar_padding,
-                    )
-
-                    current_time_lag = self.current_time - self.s.LAG_TIME
-
-                    if (
-                        self.bar_auto_play
-                        and note["channel"] in self.s.BAR_AUTO_PLAY_CHANNELS
-                    ):
-                        if current_time_lag >= note["end"]:
-                            tools.draw_stretchable_rounded_rect(
-                                screen_note,
-                                int(note["x_start"]),
-                                int(note["y"] - note["height"] / 2),
-                                int(note["width"]),
-                                int(note["height"]),
-                                self.assets.bars[note["channel"]][note["type"]][
-                                    "passed_left"
-                                ],
-                                self.assets.bars[note["channel"]][note["type"]][
-                                    "passed_mid"
-                                ],
-                                self.assets.bars[note["channel"]][note["type"]][
-                                    "passed_right"
-                                ],
-                                self.bar_padding,
-                            )
-                        elif current_time_lag > note["start"]:
-                            w = (
-                                (current_time_lag - note["start"])
-                                / (note["end"] - note["start"])
-                                * note["width"]
-                            )
+                current_time_lag = self.current_time - self.s.LAG_TIME
+                auto_play = self.bar_auto_play & np.isin(
+                    self.notes.channel[now_page_notes], self.s.BAR_AUTO_PLAY_CHANNELS
+                )
+                layer = self.get_page_layer(now_page_i)
+                self.bake_passed_notes(
+                    now_page_i,
+                    layer,
+                    auto_play & (current_time_lag >= self.notes.end[now_page_notes]),
+                )
+                screen_note = self.begin_page_composite(layer)
+                dirty_rects = []
+
+                for (
+                    start,
+                    end,
+                    x_start,
+                    x_end,
+                    y,
+                    width,
+                    channel,
+                    typ,
+                ) in self.notes.rows(
+                    now_page_notes,
+                    "start",
+                    "end",
+                    "x_start",
+                    "x_end",
+                    "y",
+                    "width",
+                    "channel",
+                    "type",
+                ):
+                    if self.bar_auto_play and channel in self.s.BAR_AUTO_PLAY_CHANNELS:
+                        bars = self.assets.bars[channel][TYPE_NAMES[typ]]
+                        if current_time_lag < end and current_time_lag > start:
+                            w = (current_time_lag - start) / (end - start) * width
                             w = (
                                 w
                                 // self.s.BAR_PASSED_ROUGHNESS
                                 * self.s.BAR_PASSED_ROUGHNESS
                             )
-                            tools.draw_stretchable_rounded_rect(
-                                screen_note,
-                                int(note["x_start"]),
-                                int(note["y"] - note["height"] / 2),
-                                int(w),
-                                int(note["height"]),
-                                self.assets.bars[note["channel"]][note["type"]][
-                                    "fill_left"
-                                ],
-                                self.assets.bars[note["channel"]][note["type"]][
-                                    "fill_mid"
-                                ],
-                                self.assets.bars[note["channel"]][note["type"]][
-                                    "fill_right"
-                                ],
-                                self.bar_padding,
+                            dirty_rects.append(
+                                self.bar_cache.draw(
+                                    screen_note,
+                                    int(x_start),
+                                    int(y - self.bar_height / 2),
+                                    int(w),
+                                    int(self.bar_height),
+                                    bars["fill_left"],
+                                    bars["fill_mid"],
+                                    bars["fill_right"],
+                                    self.bar_padding,
+                                )
                             )
 
                         # If playing, draw mic input particles
-                        playing = note["start"] <= self.current_time < note["end"]
+                        playing = start <= self.current_time < end
                         if playing:
                             px = self.now_bar_x
                             py = random.uniform(
-                                note["y"] - self.bar_height / 4,
-                                note["y"] + self.bar_height / 4,
+                                y - self.bar_height / 4,
+                                y + self.bar_height / 4,
                             )
-                            self.mic_input_particles.append(MicInputParticle(px, py))
+                            self.mic_input_particles.emit(px, py)
 
                         # Note particles including mic lag
-                        passed_time = self.current_time - self.s.LAG_TIME - note["end"]
+                        passed_time = self.current_time - self.s.LAG_TIME - end
                         if passed_time >= 0:
                             # Particles for passed notes
                             for _ in range(
                                 max(
                                     int(
-                                        (note["x_end"] - note["x_start"])
+                                        (x_end - x_start)
                                         / self.s.SCREEN_FPS
                                         * self.s.BAR_PASSED_PARTICLE_RAND
                                     ),
@@ -1063,9 +990,9 @@ class Mid2barPlayerApp:
                                 )
                             ):
                                 if random.random() < self.s.BAR_PASSED_PARTICLE_RAND:
-                                    px = random.uniform(note["x_start"], note["x_end"])
-                                    py = note["y"]
-                                    self.particles.append(Particle(px, py))
+                                    px = random.uniform(x_start, x_end)
+                                    py = y
+                                    self.particles.emit(px, py)
 
                             # Impact glow effects
                             if passed_time <= self.s.BAR_GLOW_DURATION:
@@ -1073,79 +1000,43 @@ class Mid2barPlayerApp:
                                     self.s.BAR_GLOW_DURATION - passed_time
                                 ) / self.s.BAR_GLOW_DURATION
                                 scale = (1 - a) * (self.s.BAR_GLOW_SCALE - 1) + 1
-                                scaled_w = note["width"] * scale
-                                scaled_h = note["height"] * scale
+                                scaled_w = width * scale
+                                scaled_h = self.bar_height * scale
 
-                                x_diff = (scaled_w - note["width"]) / 2
-                                y_diff = (scaled_h - note["height"]) / 2
+                                x_diff = (scaled_w - width) / 2
+                                y_diff = (scaled_h - self.bar_height) / 2
                                 bar_glow = pygame.transform.smoothscale(
-                                    self.assets.bars[note["channel"]][note["type"]][
-                                        "glow"
-                                    ],
-                                    (scaled_w, scaled_h),
+                                    bars["glow"], (scaled_w, scaled_h)
                                 )
                                 bar_glow.set_alpha(int(a * 255))
-                                screen_note.blit(
-                                    bar_glow,
-                                    (
-                                        note["x_start"] - x_diff,
-                                        note["y"] - note["height"] / 2 - y_diff,
-                                    ),
-                                )
-
-                            # Icons
-                            for i, effect in enumerate(note["effects"]):
-                                px = (
-                                    note["x_end"]
-                                    - (i + 1) * self.s.BAR_PASSED_COUNT_ICON_SIZE
-                                )
-                                py = note["y"] - (
-                                    self.s.BAR_PASSED_COUNT_ICON_SIZE
-                                    + self.s.BAR_PASSED_COUNT_ICON_MARGIN
+                                dirty_rects.append(
+                                    screen_note.blit(
+                                        bar_glow,
+                                        (
+                                            x_start - x_diff,
+                                            y - self.bar_height / 2 - y_diff,
+                                        ),
+                                    )
                                 )
-                                screen_note.blit(self.assets.icons[effect], (px, py))
-
-                # Range gauge
-                if len(now_page_notes) > 0:
-                    x1 = (
-                        (
-                            np.min([note["pitch"] for note in now_page_notes])
-                            - self.min_pitch
-                        )
-                        / (self.pitch_range)
-                        * self.s.RANGE_GAUGE_W
-                    )
-                    x2 = (
-                        (
-                            np.max([note["pitch"] for note in now_page_notes])
-                            - self.min_pitch
-                        )
-                        / (self.pitch_range)
-                        * self.s.RANGE_GAUGE_W
-                    )
-                    range_gauge = self.assets.range_gauge.subsurface(
-                        pygame.Rect(x1, 0, x2 - x1, self.s.RANGE_GAUGE_H)
-                    )
-                    screen_note.blit(
-                        range_gauge,
-                        (self.s.RANGE_GAUGE_POS[0] + x1, self.s.RANGE_GAUGE_POS[1]),
-                    )
 
-                    screen_note.set_alpha(alpha)
-                    screen_note_crop = screen_note.subsurface(pygame.Rect(*crop_bbox))
-                    self.screen.blit(screen_note_crop, (crop_bbox[0], 0))
+                self.end_page_composite(layer, dirty_rects, alpha, crop_bbox)
 
             if len(now_page_is) > 0:
                 for i in range(max(min(now_page_is) - 1, 0), max(now_page_is) + 1):
-                    notes = self.pages[i]["notes"]
-                    for note in notes:
+                    for end, x_end, y, pitch, channel, effects in self.notes.rows(
+                        self.pages[i]["notes"],
+                        "end",
+                        "x_end",
+                        "y",
+                        "pitch",
+                        "channel",
+                        "effects",
+                    ):
                         if (
                             self.bar_auto_play
-                            and note["channel"] in self.s.BAR_AUTO_PLAY_CHANNELS
+                            and channel in self.s.BAR_AUTO_PLAY_CHANNELS
                         ):
-                            passed_time = (
-                                self.current_time - self.s.LAG_TIME - note["end"]
-                            )
+                            passed_time = self.current_time - self.s.LAG_TIME - end
                             if passed_time >= 0:
                                 # Notes counter
                                 if (
@@ -1157,10 +1048,10 @@ class Mid2barPlayerApp:
                                         passed_time
                                         / self.s.BAR_PASSED_COUNT_ANIMATION_TIME
                                     )
-                                    pos0 = (note["x_end"], note["y"])
-                                    if note["pitch"] == self.max_pitch:
+                                    pos0 = (x_end, y)
+                                    if pitch == self.max_pitch:
                                         note_typ = "max"
-                                    elif note["pitch"] == self.min_pitch:
+                                    elif pitch == self.min_pitch:
                                         note_typ = "min"
                                     else:
                                         note_typ = "normal"
@@ -1178,18 +1069,11 @@ class Mid2barPlayerApp:
                                         self.s.BAR_PASSED_COUNT_ANIMATION_ACCEL,
                                     )
 
-                                    self.bar_count_particles.append(
-                                        Particle(
-                                            pos[0],
-                                            pos[1],
-                                            size_range=(5, 8),
-                                            life_decay=0.02,
-                                            colors=col,
-                                            v=0.5,
-                                        )
+                                    self.bar_count_particles.emit(
+                                        pos[0], pos[1], colors=col
                                     )
 
-                                    for effect in note["effects"]:
+                                    for effect in EFFECT_LISTS[effects]:
                                         pos1 = self.s.BAR_PASSED_COUNT_ANIMATION_DICT[
                                             effect
                                         ]["pos"]
@@ -1204,15 +1088,8 @@ class Mid2barPlayerApp:
                                             self.s.BAR_PASSED_COUNT_ANIMATION_ACCEL,
                                         )
 
-                                        self.bar_count_particles.append(
-                                            Particle(
-                                                pos[0],
-                                                pos[1],
-                                                size_range=(5, 8),
-                                                life_decay=0.02,
-                                                colors=col,
-                                                v=0.5,
-                                            )
+                                        self.bar_count_particles.emit(
+                                            pos[0], pos[1], colors=col
                                         )
 
     def draw_menubar(self):
@@ -1234,26 +1111,19 @@ class Mid2barPlayerApp:
             f"[{space}]{play_pause}  [{up_down}]{vol}:{self.music_volume} [R]{restart}  [F11]{toggle_fullscreen}  [ESC]{_quit}",
         ]
         for i, text in enumerate(help_texts):
-            help_surface = self.small_font.render(text, True, (200, 200, 200))
+            help_surface = self.text_cache.render(
+                self.small_font, text, (200, 200, 200)
+            )
             self.screen.blit(help_surface, (self.s.BAR_AREA_LEFT, help_y + i * 40))
 
-    def _update_particle_list(self, particle_list, screen):
-        new_list = []
-        for p in particle_list:
-            p.update()
-            if p.life > 0:
-                p.draw(screen)
-                new_list.append(p)
-        return new_list
-
     def update_particles(self):
-        self.particles = self._update_particle_list(self.particles, self.screen)
-        self.mic_input_particles = self._update_particle_list(
-            self.mic_input_particles, self.screen
-        )
-        self.bar_count_particles = self._update_particle_list(
-            self.bar_count_particles, self.screen
-        )
+        for particles in [
+            self.particles,
+            self.mic_input_particles,
+            self.bar_count_particles,
+        ]:
+            particles.update()
+            particles.draw(self.screen)
 
     def draw_title(self):
         if self.title_image is not None:
@@ -1276,9 +1146,9 @@ class Mid2barPlayerApp:
                 self.s.SPLASH_TEXT_LINE_HEIGHT * (len(texts) - 1)
             )
             for text in texts:
-                text_surf = tools.render_outlined_text(
-                    text,
+                text_surf = self.text_cache.render_outlined(
                     self.large_font,
+                    text,
                     text_color=(255, 255, 255),
                     outline_color=(0, 0, 0),
                     outline_width=8,
@@ -1297,6 +1167,7 @@ class Mid2barPlayerApp:
             self.recorder.start(
                 screen_size=(self.s.SCREEN_WIDTH, self.s.SCREEN_HEIGHT),
                 fps=self.s.SCREEN_FPS,
+                out_path=self.record_path,
                 audio_path=self.audio_path,
                 audio_codec=self.s.AUDIO_CODEC,
                 audio_bps=self.s.AUDIO_BPS,
@@ -1476,90 +1347,57 @@ class Mid2barPlayerApp:
 
                             break
 
-    def draw_bar_count(self):
-        if self.enable_mic_input:
-            passed_notes = [
-                note
-                for note in self.mic_notes
-                if note["end"] + self.s.BAR_PASSED_COUNT_ANIMATION_TIME
-                <= self.current_time
-                and note["type"] == "match_all"
-            ]
-        else:
-            passed_notes = [
-                note
-                for note in self.notes
-                if note["end"]
-                + self.s.LAG_TIME
-                + self.s.BAR_PASSED_COUNT_ANIMATION_TIME
-                <= self.current_time
-                and note["channel"] in self.s.BAR_AUTO_PLAY_CHANNELS
-                and self.bar_auto_play
-            ]
-
-        n_passed_notes_max = sum(
-            [note["pitch"] == self.max_pitch for note in passed_notes]
-        )
-        n_passed_notes_min = sum(
-            [note["pitch"] == self.min_pitch for note in passed_notes]
-        )
-        n_passed_notes_normal = (
-            len(passed_notes) - n_passed_notes_max - n_passed_notes_min
+    def count_passed_mic_notes(self):
+        # Only the last mic note can still change, the others are added once
+        n_fixed = max(len(self.mic_notes) - 1, 0)
+        rows = np.arange(len(self.mic_passed_counter), n_fixed)
+        self.mic_passed_counter.extend(
+            self.mic_notes.end[rows] + self.s.BAR_PASSED_COUNT_ANIMATION_TIME,
+            count_categories(self.mic_notes, rows, self.min_pitch, self.max_pitch)
+            * (self.mic_notes.type[rows] == TYPE_CODES["match_all"])[:, None],
         )
+        counts = self.mic_passed_counter.counts(self.current_time)
 
-        count_normal = self.bar_count_font.render(
-            f"{n_passed_notes_normal}", True, self.s.BAR_COUNT_DICT["normal"]["color"]
-        )
-        x, y = self.s.BAR_COUNT_DICT["normal"]["pos"]
-        rect = count_normal.get_rect(right=x, top=y)
-        self.screen.blit(count_normal, rect)
+        if (
+            len(self.mic_notes) > 0
+            and self.mic_notes.end[-1] + self.s.BAR_PASSED_COUNT_ANIMATION_TIME
+            <= self.current_time
+            and self.mic_notes.type[-1] == TYPE_CODES["match_all"]
+        ):
+            last = count_categories(
+                self.mic_notes, [-1], self.min_pitch, self.max_pitch
+            )
+            counts = counts + last[0]
+        return counts
 
-        count_max = self.bar_count_font.render(
-            f"{n_passed_notes_max}", True, self.s.BAR_COUNT_DICT["max"]["color"]
-        )
-        x, y = self.s.BAR_COUNT_DICT["max"]["pos"]
-        rect = count_max.get_rect(right=x, top=y)
-        self.screen.blit(count_max, rect)
+    def draw_bar_count(self):
+        if self.enable_mic_input:
+            counts = self.count_passed_mic_notes()
+        elif self.bar_auto_play:
+            counts = self.passed_counter.counts(self.current_time)
+        else:
+            counts = [0] * len(COUNT_CATEGORIES)
 
-        count_min = self.bar_count_font.render(
-            f"{n_passed_notes_min}", True, self.s.BAR_COUNT_DICT["min"]["color"]
-        )
-        x, y = self.s.BAR_COUNT_DICT["min"]["pos"]
-        rect = count_min.get_rect(right=x, top=y)
-        self.screen.blit(count_min, rect)
-
-        for effect in ["up", "down", "long"]:
-            n = sum([effect in note["effects"] for note in passed_notes])
-            count = self.bar_count_font.render(
-                f"{n}", True, self.s.BAR_COUNT_DICT[effect]["color"]
+        for category, value in zip(COUNT_CATEGORIES, list(counts)):
+            surface = self.text_cache.render(
+                self.bar_count_font,
+                f"{value}",
+                self.s.BAR_COUNT_DICT[category]["color"],
             )
-            x, y = self.s.BAR_COUNT_DICT[effect]["pos"]
-            rect = count.get_rect(right=x, top=y)
-            self.screen.blit(count, rect)
+            x, y = self.s.BAR_COUNT_DICT[category]["pos"]
+            self.screen.blit(surface, surface.get_rect(right=x, top=y))
 
     def draw_seekbar(self):
         if self.enable_mic_input:
-            scores = [
-                s
-                for s in self.page_scores
-                if s["end_time"] < self.current_time and s["number_of_notes"] > 0
-            ]
-            score = (
-                np.array([s["weighted_score"] for s in scores]).mean()
-                if len(scores) > 0
-                else 0.0
-            )
-            page_score = scores[-1]["weighted_score"] if len(scores) > 0 else 0.0
-
-            now_scores = [
-                s
-                for s in self.page_scores
-                if s["start_time"] <= self.current_time
-                and self.current_time < s["end_time"]
-            ]
-            now_score = now_scores[-1]["weighted_score"] if len(now_scores) > 0 else 0.0
-
-            score_str = f" {get_lang_text_app('total')}: {score:3.3f}, {get_lang_text_app('page')}: {page_score:3.3f}, {get_lang_text_app('now')}: {now_score:3.3f}"
+            engine = self.score_engine
+            engine.advance(self.current_time)
+            scores = (engine.total_score(), engine.page_score(), engine.now_score())
+            # Formatted again only when one of the scores changed
+            if scores != self.seekbar_scores:
+                score, page_score, now_score = scores
+                self.seekbar_scores = scores
+                self.seekbar_score_str = f" {get_lang_text_app('total')}: {score:3.3f}, {get_lang_text_app('page')}: {page_score:3.3f}, {get_lang_text_app('now')}: {now_score:3.3f}"
+            score_str = self.seekbar_score_str
         else:
             score_str = ""
 
@@ -1598,9 +1436,9 @@ class Mid2barPlayerApp:
             current_sec = int(self.current_time % 60)
             total_min = int(self.song_duration // 60)
             total_sec = int(self.song_duration % 60)
-            time_text = self.large_font.render(
+            time_text = self.text_cache.render(
+                self.large_font,
                 f"{current_min:02d}:{current_sec:02d} / {total_min:02d}:{total_sec:02d} {score_str}",
-                True,
                 self.s.TEXT_COLOR,
             )
             self.screen.blit(
@@ -1610,7 +1448,10 @@ class Mid2barPlayerApp:
 
     def draw(self):
         # Background video
-        if self.video_start_time is None or self.recorder is None:
+        if self.headless:
+            # Follow the song time so that every render gives the same frames
+            cur = self.current_time
+        elif self.video_start_time is None or self.recorder is None:
             cur = None
         else:
             cur = self.video_start_time + self.current_time - self.current_time_diff
@@ -1638,6 +1479,8 @@ class Mid2barPlayerApp:
             if self.current_time <= self.s.DISPLAY_TITLE_DURATION:
                 self.draw_title()
             else:
+                # Shared by the drawing below
+                self.now_page_is = self.get_current_page_i()
                 self.draw_background()
                 self.draw_background_lines()
                 self.draw_notes()
@@ -1662,6 +1505,9 @@ class Mid2barPlayerApp:
         self.update_screen()
 
     def update_screen(self):
+        if self.headless:
+            return
+
         scale_x = self.window_w / self.s.SCREEN_WIDTH
         scale_y = self.window_h / self.s.SCREEN_HEIGHT
         self.screen_scale = min(scale_x, scale_y)
@@ -1685,6 +1531,9 @@ class Mid2barPlayerApp:
         pygame.display.flip()
 
     def run(self):
+        if self.headless:
+            return self.render()
+
         clock = pygame.time.Clock()
 
         waiting = True
@@ -1736,9 +1585,7 @@ class Mid2barPlayerApp:
                         self.enable_mic_input = not self.enable_mic_input
                         if self.enable_mic_input:
                             self.bar_auto_play = False
-                            self.detector = RealtimeFFTPitchDetector(
-                                settings_json_path=self.setting_json_path
-                            )
+                            self.detector = self.create_detector()
                             self.detector.start()
 
                     elif event.key == pygame.K_F11:
@@ -1797,3 +1644,40 @@ class Mid2barPlayerApp:
             self.detector.stop()
         pygame.quit()
         return
+
+    def render(self):
+        """Record every frame as fast as possible, without a window or events.
+
+        Frame i shows the time i / fps. Returns the exit status, 0 when the
+        video was written.
+        """
+        if self.recorder is None:
+            print("Headless mode renders recordings only (record=True)")
+            return 1
+
+        status = 0
+        try:
+            self.play()
+            for frame_index in range(self.recorder.total_frames):
+                self.current_time = frame_index / self.recorder.fps
+                if self.current_time >= self.song_duration:
+                    break
+                self.draw()
+                if self.enable_mic_input:
+                    self.compute_note_scores()
+                if not self.recorder.push_frame(self.screen):
+                    status = 1
+                    break
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
+            status = 1
+        finally:
+            if self.recorder.finish():
+                status = 1
+            self.video_player.close()
+            if self.enable_mic_input:
+                self.detector.stop()
+            pygame.quit()
+        return status
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import mid2csv
+import settings_loader
+from fft import WavReplayPitchDetector
+from mic_matcher import MicNoteMatcher
+from mic_samples import MicSampleBuffer, add_mic_sample, mic_frame_times
+from note_table import NoteTable
+from scoring import PageScoreEngine, mic_page_rows, split_pages
+
+# Scores recorded vocal takes without pygame: the take is analysed in one
+# pass, read at the frame times of the player, and the samples go through the
+# same matcher and page scoring as the mic input of the player.
+
+
+class Song:
+    """Notes and pages of one MIDI file, as laid out by the player"""
+
+    def __init__(self, mid_path, channel, settings_json_path):
+        self.settings_json_path = settings_json_path
+        self.s = settings_loader.load(settings_json_path)
+        self.channel = channel
+
+        tables = mid2csv.convert_cached(mid_path)
+        note_table = tables["note"]
+        self.notes = NoteTable.from_columns(
+            start=note_table["start"],
+            end=note_table["end"],
+            pitch=note_table["pitch"],
+            channel=note_table["channel"],
+        )
+        self.notes.sort("start")
+
+        separator_times = tables["marker"]["time"].tolist()
+        if separator_times:
+            separator_times.append(separator_times[-1] + 10)
+        self.pages = split_pages(
+            self.notes, separator_times, self.s.HIDE_NOW_BAR_WHEN_NO_NOTES
+        )
+        self.rows = np.flatnonzero(self.notes.channel == channel)
+
+    def score(self, wav_path, delay=None, duration=None):
+        """Per-note and per-page scores of one take.
+
+        The scores are the ones the player shows at the end of the song when
+        it replays the take, `duration` seconds long (default: the take's).
+        """
+        s = self.s
+        if delay is None:
+            delay = s.MIC_INPUT_DELAY
+
+        detector = WavReplayPitchDetector(self.settings_json_path, wav_path)
+        if duration is None:
+            duration = len(detector.samples) / detector.sample_rate
+        times = mic_frame_times(s.SCREEN_FPS, s.DISPLAY_TITLE_DURATION, duration)
+        samples = MicSampleBuffer()
+        for t, result in zip(times, detector.results_at(times)):
+            add_mic_sample(samples, result, t - delay, s.RMS_THRESHOLD)
+        # The player stops matching and scoring at its last frame
+        end_time = times[-1] if len(times) > 0 else 0.0
+
+        mic_notes = NoteTable()
+        matcher = MicNoteMatcher(
+            self.notes,
+            self.rows,
+            samples,
+            mic_notes,
+            channel=self.channel,
+            margin=s.MIC_INPUT_MARGIN,
+            connect_duration=s.MIC_INPUT_NOTE_CONNECT_DURATION,
+            tolerance=s.MIC_INPUT_PITCH_TOLERANCE,
+        )
+        matcher.update(end_time - delay)
+
+        mic_pages = [
+            {"notes": mic_page_rows(mic_notes, page["start_time"], page["end_time"])}
+            for page in self.pages
+        ]
+        engine = PageScoreEngine(
+            self.notes,
+            self.pages,
+            self.channel,
+            s.PITCH_MATCH_SCORE_RATIO,
+            s.PITCH_ACCURACY_SCORE_RATIO,
+        )
+        engine.update(mic_notes, mic_pages, end_time)
+
+        notes = self.notes
+        rows = self.rows
+        return {
+            "wav": wav_path,
+            "score": float(engine.total_score()),
+            "pages": [dict(score) for score in engine.page_scores],
+            "notes": [
+                {
+                    "start": start,
+                    "end": end,
+                    "pitch": pitch,
+                    "match_ratio": match_ratio,
+                    "pitch_accuracy": pitch_accuracy,
+                }
+                for start, end, pitch, match_ratio, pitch_accuracy in zip(
+                    notes.start[rows].tolist(),
+                    notes.end[rows].tolist(),
+                    notes.pitch[rows].tolist(),
+                    notes.match_ratio[rows].tolist(),
+                    notes.pitch_accuracy[rows].tolist(),
+                )
+            ],
+        }
+
+
+# Song of the worker process, loaded once by the pool initializer
+_song = None
+
+
+def _init_worker(mid_path, channel, settings_json_path):
+    global _song
+    _song = Song(mid_path, channel, settings_json_path)
+
+
+def _score_take(wav_path, delay, duration):
+    try:
+        return _song.score(wav_path, delay, duration)
+    except Exception as e:
+        return {"wav": wav_path, "error": f"{type(e).__name__}: {e}"}
+
+
+def score_takes(
+    mid_path,
+    channel,
+    wav_paths,
+    settings_json_path,
+    delay=None,
+    duration=None,
+    jobs=None,
+):
+    """Results of `Song.score` for every take, in order, scored in parallel"""
+    # Convert a new MIDI file here, so the workers all load it from the cache
+    # instead of converting and saving it at the same time
+    mid2csv.convert_cached(mid_path)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(mid_path, channel, settings_json_path),
+    ) as pool:
+        yield from pool.map(
+            _score_take,
+            wav_paths,
+            [delay] * len(wav_paths),
+            [duration] * len(wav_paths),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score recorded vocal takes against a MIDI channel"
+    )
+    parser.add_argument("-m", "--mid", required=True, help="MIDI file of the song")
+    parser.add_argument("-c", "--channel", type=int, default=0, help="Vocal channel")
+    parser.add_argument("wavs", nargs="+", help="Vocal takes in sync with the song")
+    parser.add_argument("-s", "--settings", default="app_settings/settings.json")
+    parser.add_argument(
+        "--delay",
+        type=float,
+        help="Seconds subtracted from the sample times (default: MIC_INPUT_DELAY)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        help="Length of the song in seconds (default: length of each take)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, help="Worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="Write <take>.json files there instead of a JSON list to stdout",
+    )
+    args = parser.parse_args()
+
+    results = score_takes(
+        args.mid,
+        args.channel,
+        args.wavs,
+        args.settings,
+        args.delay,
+        args.duration,
+        args.jobs,
+    )
+    failed = 0
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        for result in results:
+            name = os.path.splitext(os.path.basename(result["wav"]))[0]
+            with open(os.path.join(args.output_dir, f"{name}.json"), "w") as f:
+                json.dump(result, f, indent=2)
+            if "error" in result:
+                failed += 1
+                print(f"{result['wav']}: {result['error']}", file=sys.stderr)
+            else:
+                print(f"{result['wav']}: {result['score']:.2f}")
+    else:
+        results = list(results)
+        failed = sum("error" in result for result in results)
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    sys.exit(1 if failed else 0)
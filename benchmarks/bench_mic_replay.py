@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# tools loads ./lang on import, the app resolves its images next to main.py
+os.chdir(ROOT)
+sys.argv[0] = os.path.join(ROOT, "main.py")
+
+from app import Mid2barPlayerApp
+
+SAMPLE = "sample/【音楽：魔王魂】シャイニングスター（ショート）"
+STAGES = [
+    "update_mic_inputs",
+    "update_mic_notes",
+    "calc_pages_mic",
+    "compute_note_scores",
+]
+
+
+def synth_vocal(notes, channel, duration, path, sample_rate=44100, detune=0.0):
+    """Write the notes of `channel` as a harmonic tone to a 16-bit WAV file"""
+    freq = np.zeros(int(duration * sample_rate))
+    rows = np.flatnonzero(notes.channel == channel)
+    for start, end, pitch in zip(notes.start[rows], notes.end[rows], notes.pitch[rows]):
+        a, b = int(start * sample_rate), int(end * sample_rate)
+        freq[a:b] = 440.0 * 2 ** ((pitch + detune - 69) / 12)
+    phase = 2 * np.pi * np.cumsum(freq) / sample_rate
+    signal = sum(np.sin(k * phase) / k for k in range(1, 5))
+    signal *= 0.2 * (freq > 0) / np.max(np.abs(signal))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((signal * 32767).astype(np.int16).tobytes())
+
+
+def make_app(channel, settings_path, lyrics_settings_path):
+    return Mid2barPlayerApp(
+        SAMPLE + "_inst.mp3",
+        SAMPLE + ".mid",
+        SAMPLE + ".lrc",
+        lyrics_settings_path,
+        [],
+        credit_text="",
+        splash_image="images/title/splash.png",
+        title_image="images/title/シャイニングスター.png",
+        mic_input_channel=channel,
+        settings_json_path=settings_path,
+        assets_json_path="app_settings/assets.json",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Profile the mic scoring path by replaying a vocal WAV file"
+    )
+    parser.add_argument(
+        "--wav", help="vocal take in sync with the song (default: synthesized)"
+    )
+    parser.add_argument("--channel", type=int, default=0)
+    parser.add_argument("--settings", default="app_settings/settings.json")
+    parser.add_argument(
+        "--lyrics-settings", default="./lyrics_settings/settings_default.json"
+    )
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument(
+        "--detune", type=float, default=0.0, help="semitones added to the synth"
+    )
+    args = parser.parse_args()
+
+    app = make_app(args.channel, args.settings, args.lyrics_settings)
+    wav_path = args.wav
+    if wav_path is None:
+        wav_path = os.path.join(tempfile.mkdtemp(), "vocal.wav")
+        synth_vocal(
+            app.notes, args.channel, app.song_duration, wav_path, detune=args.detune
+        )
+    app.enable_mic_input = True
+    app.mic_replay_path = wav_path
+    app.detector = app.create_detector()
+
+    elapsed = dict.fromkeys(STAGES, 0.0)
+    n_frames = int(app.song_duration * args.fps)
+    for i in range(n_frames):
+        app.current_time = i / args.fps
+        for name in STAGES:
+            t0 = time.perf_counter()
+            getattr(app, name)()
+            elapsed[name] += time.perf_counter() - t0
+    app.score_engine.advance(app.song_duration + 1)
+
+    print(f"{n_frames} frames, {len(app.mic_notes)} mic notes")
+    print(f"{'stage':>20} {'[ms/frame]':>11}")
+    for name in STAGES:
+        print(f"{name:>20} {elapsed[name] / n_frames * 1000:>11.3f}")
+    print(f"{'total':>20} {sum(elapsed.values()) / n_frames * 1000:>11.3f}")
+    print(f"score: {app.score_engine.total_score():.2f}")
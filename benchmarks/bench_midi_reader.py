@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mid2csv
+from bench_note_pairing import write_synthetic_midi
+
+
+def measure(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark py_midicsv and mido ingestion of mid2csv"
+    )
+    parser.add_argument(
+        "-n", "--notes", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'notes':>8} {'read midicsv':>13} {'read mido':>10} "
+        f"{'convert midicsv':>16} {'convert mido':>13}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_notes in args.notes:
+            midi_path = os.path.join(tmp_dir, f"synthetic_{n_notes}.mid")
+            write_synthetic_midi(midi_path, n_notes)
+
+            times = [
+                measure(mid2csv.read_events, midi_path, "midicsv"),
+                measure(mid2csv.read_events, midi_path, "mido"),
+            ]
+            for reader in ["midicsv", "mido"]:
+                out_dir = os.path.join(tmp_dir, reader)
+                times.append(
+                    measure(
+                        mid2csv.convert,
+                        midi_path,
+                        os.path.join(out_dir, "note.csv"),
+                        os.path.join(out_dir, "marker.csv"),
+                        os.path.join(out_dir, "text.csv"),
+                        parser=reader,
+                    )
+                )
+            print(
+                f"{n_notes:>8} {times[0]:>12.3f}s {times[1]:>9.3f}s "
+                f"{times[2]:>15.3f}s {times[3]:>12.3f}s"
+            )
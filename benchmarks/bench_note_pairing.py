@@ -0,0 +1,113 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import mido
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mid2csv
+
+
+def write_synthetic_midi(path, n_notes, n_channels=4, seed=0):
+    """Dense multi-channel melody: every channel plays overlapping short notes."""
+    rng = random.Random(seed)
+    mid = mido.MidiFile(ticks_per_beat=480)
+    track = mido.MidiTrack()
+    mid.tracks.append(track)
+    track.append(mido.MetaMessage("time_signature", numerator=4, denominator=4))
+    track.append(mido.MetaMessage("key_signature", key="C"))
+    track.append(mido.MetaMessage("set_tempo", tempo=500000))
+
+    events = []
+    for i in range(n_notes):
+        channel = i % n_channels
+        start = (i // n_channels) * 120 + rng.randint(0, 60)
+        length = rng.randint(30, 480)
+        pitch = rng.randint(48, 84)
+        events.append((start, 1, channel, pitch))
+        events.append((start + length, 0, channel, pitch))
+    events.sort()
+
+    t_prev = 0
+    for tick, is_on, channel, pitch in events:
+        typ = "note_on" if is_on else "note_off"
+        track.append(
+            mido.Message(
+                typ,
+                channel=channel,
+                note=pitch,
+                velocity=100 if is_on else 0,
+                time=tick - t_prev,
+            )
+        )
+        t_prev = tick
+    track.append(mido.MetaMessage("end_of_track", time=480))
+    mid.save(path)
+
+
+def pair_notes_legacy(df):
+    """Note pairing as done by mid2csv.convert before the single-pass matcher."""
+    notes = []
+    for _, row in df[df[2] == "Note_on_c"].iterrows():
+        t_note_on = int(row[1])
+        channel = int(row[3])
+        pitch = int(row[4])
+
+        for _, row2 in df[df[1] > t_note_on].iterrows():
+            if int(row2[1]) <= t_note_on:
+                continue
+            elif (
+                row2[2] == "Note_off_c"
+                and int(row2[3]) == channel
+                and int(row2[4]) == pitch
+            ):
+                t_note_off = int(row2[1])
+                break
+
+        notes.append([t_note_on, t_note_off, channel, pitch])
+    return notes
+
+
+def measure(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark note-on/note-off pairing of mid2csv"
+    )
+    parser.add_argument(
+        "-n", "--notes", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument(
+        "--legacy-limit",
+        type=int,
+        default=10000,
+        help="Skip the quadratic legacy matcher above this number of notes",
+    )
+    args = parser.parse_args()
+
+    print(f"{'notes':>8} {'legacy [s]':>12} {'single-pass [s]':>16} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_notes in args.notes:
+            midi_path = os.path.join(tmp_dir, f"synthetic_{n_notes}.mid")
+            write_synthetic_midi(midi_path, n_notes)
+            df = mid2csv.midi_to_csv(midi_path)
+            df[1] = df[1].astype(int)
+            events, _, _ = mid2csv.read_events(midi_path)
+
+            t_new, notes_new = measure(mid2csv.pair_notes, events)
+            if n_notes <= args.legacy_limit:
+                t_old, notes_old = measure(pair_notes_legacy, df)
+                assert notes_old == notes_new, "pairing results differ"
+                print(
+                    f"{n_notes:>8} {t_old:>12.3f} {t_new:>16.3f} {t_old / t_new:>8.1f}x"
+                )
+            else:
+                print(f"{n_notes:>8} {'skipped':>12} {t_new:>16.3f} {'-':>9}")
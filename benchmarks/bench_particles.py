@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# tools loads ./lang on import
+os.chdir(ROOT)
+
+import pygame
+
+from particle import Particle, ParticleSystem
+
+WIDTH, HEIGHT = 1920, 1080
+# Slow enough for every particle to stay alive during the run
+LIFE_DECAY = 0.001
+
+
+def run_legacy(surface, n_particles, n_frames):
+    particles = [
+        Particle(
+            random.uniform(0, WIDTH),
+            random.uniform(0, HEIGHT),
+            life_decay=LIFE_DECAY,
+        )
+        for _ in range(n_particles)
+    ]
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        for p in particles[:]:
+            p.update()
+            p.draw(surface)
+            if p.life <= 0:
+                particles.remove(p)
+    return (time.perf_counter() - t0) / n_frames
+
+
+def run_system(surface, n_particles, n_frames):
+    particles = ParticleSystem(capacity=n_particles, life_decay=LIFE_DECAY)
+    for _ in range(n_particles):
+        particles.emit(random.uniform(0, WIDTH), random.uniform(0, HEIGHT))
+    # Render the sprites before timing
+    particles.draw(surface)
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        particles.update()
+        particles.draw(surface)
+    return (time.perf_counter() - t0) / n_frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark frame time of Particle objects and ParticleSystem"
+    )
+    parser.add_argument(
+        "-n", "--particles", type=int, nargs="+", default=[100, 1000, 10000]
+    )
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    pygame.init()
+    surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+
+    print(f"{'particles':>10} {'legacy [ms]':>12} {'system [ms]':>12} {'speedup':>9}")
+    for n_particles in args.particles:
+        random.seed(0)
+        t_old = run_legacy(surface, n_particles, args.frames)
+        random.seed(0)
+        t_new = run_system(surface, n_particles, args.frames)
+        print(
+            f"{n_particles:>10} {t_old * 1000:>12.3f} {t_new * 1000:>12.3f} "
+            f"{t_old / t_new:>8.1f}x"
+        )
@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fft
+
+TONES = {
+    "sine": [1.0],
+    "harmonic": [1.0 / k for k in range(1, 9)],
+    # Voice-like: the 2nd and 3rd harmonics are stronger than the fundamental
+    "weak fundamental": [0.3, 1.0, 0.8, 0.5, 0.3, 0.2],
+}
+
+
+def synth_frames(freq, amplitudes, sample_rate, block_size, hop_size, rng):
+    """Frames of one second of a harmonic tone with a little noise"""
+    t = np.arange(sample_rate) / sample_rate
+    signal = sum(
+        a * np.sin(2 * np.pi * k * freq * t + rng.uniform(0, 2 * np.pi))
+        for k, a in enumerate(amplitudes, start=1)
+        if k * freq < sample_rate / 2
+    )
+    signal = 0.2 * signal / np.max(np.abs(signal))
+    signal += 0.002 * rng.standard_normal(len(signal))
+    return np.lib.stride_tricks.sliding_window_view(signal, block_size)[::hop_size]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Accuracy and speed of the pitch estimators on synthetic tones"
+    )
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--block-size", type=int, default=4096)
+    parser.add_argument("--hop-size", type=int, default=1024)
+    parser.add_argument("--min-midi", type=int, default=40)
+    parser.add_argument("--max-midi", type=int, default=84)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    midis = np.arange(args.min_midi, args.max_midi + 1)
+    tones = {
+        name: [
+            synth_frames(
+                440.0 * 2 ** ((midi - 69) / 12),
+                amplitudes,
+                args.sample_rate,
+                args.block_size,
+                args.hop_size,
+                rng,
+            )
+            for midi in midis
+        ]
+        for name, amplitudes in TONES.items()
+    }
+
+    print(
+        f"{'estimator':>10} {'tone':>17} {'median [cent]':>14} "
+        f"{'gross [%]':>10} {'batch [ms/frame]':>17} {'single [ms]':>12}"
+    )
+    for name, estimator_cls in fft.ESTIMATORS.items():
+        estimator = estimator_cls(args.sample_rate, args.block_size)
+        for tone, frames_per_midi in tones.items():
+            errors = []
+            t_batch = 0.0
+            n_frames = 0
+            for midi, frames in zip(midis, frames_per_midi):
+                t0 = time.perf_counter()
+                freq, _ = estimator.estimate(frames)
+                t_batch += time.perf_counter() - t0
+                n_frames += len(frames)
+                cents = 100 * (fft.freq_to_midi(freq) - midi)
+                errors.append(np.where(np.isnan(cents), np.inf, np.abs(cents)))
+            errors = np.concatenate(errors)
+
+            single = frames_per_midi[0][:1]
+            t0 = time.perf_counter()
+            for _ in range(20):
+                estimator.estimate(single)
+            t_single = (time.perf_counter() - t0) / 20
+
+            print(
+                f"{name:>10} {tone:>17} {np.median(errors):>14.1f} "
+                f"{np.mean(errors > 50) * 100:>10.1f} "
+                f"{t_batch / n_frames * 1000:>17.3f} {t_single * 1000:>12.3f}"
+            )
@@ -0,0 +1,79 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pitch_math
+
+
+def mod12_custom(x):
+    """Scalar helper formerly wrapped with np.vectorize"""
+    r = x % 12
+    if r > 6:
+        r -= 12
+    return r
+
+
+def freq_to_midi_scalar(freq):
+    if freq is None or freq <= 0:
+        return None
+    return 69.0 + 12.0 * math.log2(freq / 440.0)
+
+
+def measure(func, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the array pitch helpers against the scalar ones"
+    )
+    parser.add_argument(
+        "-n", "--samples", type=int, nargs="+", default=[10, 100, 1000, 100000]
+    )
+    args = parser.parse_args()
+
+    vec_mod12 = np.vectorize(mod12_custom)
+    rng = np.random.default_rng(0)
+
+    print(
+        f"{'samples':>8} {'function':>13} {'scalar [ms]':>12} {'array [ms]':>11} "
+        f"{'speedup':>9}"
+    )
+    for n in args.samples:
+        diffs = rng.uniform(-30, 30, n)
+        pitches = rng.uniform(40, 80, n)
+        freqs = rng.uniform(80, 1000, n)
+
+        t_old, old = measure(vec_mod12, diffs)
+        t_new, new = measure(pitch_math.mod12, diffs)
+        assert np.array_equal(old, new), "mod12 results differ"
+        rows = [("mod12", t_old, t_new)]
+
+        t_old, old = measure(
+            lambda: [pitch_math.round_pitch(p, 60, 0.8) for p in pitches.tolist()]
+        )
+        t_new, new = measure(pitch_math.round_pitch, pitches, 60, 0.8)
+        assert np.array_equal(old, new), "round_pitch results differ"
+        rows.append(("round_pitch", t_old, t_new))
+
+        t_old, old = measure(lambda: [freq_to_midi_scalar(f) for f in freqs.tolist()])
+        t_new, new = measure(pitch_math.freq_to_midi, freqs)
+        assert np.allclose(old, new), "freq_to_midi results differ"
+        rows.append(("freq_to_midi", t_old, t_new))
+
+        for name, t_old, t_new in rows:
+            print(
+                f"{n:>8} {name:>13} {t_old * 1000:>12.3f} {t_new * 1000:>11.3f} "
+                f"{t_old / t_new:>8.1f}x"
+            )
@@ -1,11 +1,16 @@
-import math
+import abc
 import queue
 import threading
 import time
+import wave
 import numpy as np
-import sounddevice as sd
+from dataclasses import dataclass
 
 import settings_loader
+from pitch_math import freq_to_midi
+
+# np.fft.rfft takes an output array since NumPy 2.0
+RFFT_HAS_OUT = int(np.__version__.split(".")[0]) >= 2
 
 
 # --------------------------------------------------------------
@@ -13,12 +18,6 @@ import settings_loader
 # --------------------------------------------------------------
 
 
-def freq_to_midi(freq):
-    if freq is None or freq <= 0:
-        return None
-    return 69.0 + 12.0 * math.log2(freq / 440.0)
-
-
 def midi_to_note_name(settings, midi_float):
     if midi_float is None:
         return None
@@ -28,21 +27,289 @@ def midi_to_note_name(settings, midi_float):
     return f"{name}{octave}"
 
 
-def parabolic_interpolation(mag, peak_index):
-    if peak_index <= 0 or peak_index >= len(mag) - 1:
-        return float(peak_index), mag[peak_index]
-    alpha = mag[peak_index - 1]
-    beta = mag[peak_index]
-    gamma = mag[peak_index + 1]
+def read_wav(path):
+    """First channel of a PCM WAV file as floats in [-1, 1], and its sample rate"""
+    with wave.open(path, "rb") as f:
+        sample_rate = f.getframerate()
+        n_channels = f.getnchannels()
+        width = f.getsampwidth()
+        raw = f.readframes(f.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float64) - 128) / 128
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints / float(1 << 23)
+    else:
+        dtype = {2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(raw, dtype=dtype) / float(1 << (8 * width - 1))
+    return samples[::n_channels].copy(), sample_rate
+
+
+def parabolic_interpolation_rows(mag, peak_index):
+    """Vertex of the parabola through peak_index[i] and its neighbours in mag[i]
+
+    Peaks on the edges or on a flat top are returned as they are.
+    """
+    rows = np.arange(len(mag))
+    inner = np.clip(peak_index, 1, mag.shape[1] - 2)
+    alpha = mag[rows, inner - 1]
+    beta = mag[rows, peak_index]
+    gamma = mag[rows, inner + 1]
     denom = alpha - 2 * beta + gamma
-    if denom == 0:
-        return float(peak_index), beta
-    p = 0.5 * (alpha - gamma) / denom
+    valid = (peak_index > 0) & (peak_index < mag.shape[1] - 1) & (denom != 0)
+    p = np.zeros(len(mag))
+    np.divide(0.5 * (alpha - gamma), denom, out=p, where=valid)
     refined_index = peak_index + p
-    refined_mag = beta - 0.25 * (alpha - gamma) * p
+    refined_mag = np.where(valid, beta - 0.25 * (alpha - gamma) * p, beta)
     return refined_index, refined_mag
 
 
+@dataclass(frozen=True)
+class PitchSnapshot:
+    """One analysis result, published as a whole so it can't be read torn"""
+
+    freq: float = None
+    mag: float = None
+    rms: float = 0
+    time: float = 0
+    seq: int = 0
+
+
+# --------------------------------------------------------------
+# Pitch estimators
+# --------------------------------------------------------------
+
+
+def first_true(mask):
+    """Index of the first True of every row of `mask` and whether there is one"""
+    return np.argmax(mask, axis=1), mask.any(axis=1)
+
+
+def refine_peak(values, index):
+    """Sub-sample position of the maximum values[i, index[i]], within +-0.5"""
+    refined_index, _ = parabolic_interpolation_rows(values, index)
+    return np.clip(refined_index, index - 0.5, index + 0.5)
+
+
+class PitchEstimator(abc.ABC):
+    """Pitch of every row of a batch of frames of shape (n_frames, block_size).
+
+    `estimate` returns the frequency [Hz] and a strength per frame, with NaN
+    frequencies where no pitch was found. `name` is the PITCH_ESTIMATOR value
+    selecting the estimator.
+    """
+
+    name = None
+
+    def __init__(self, sample_rate, block_size, min_freq=50.0, max_freq=2000.0):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+
+    @abc.abstractmethod
+    def estimate(self, frames):
+        pass
+
+
+class SpectrumEstimator(PitchEstimator):
+    """Estimators working on the magnitude spectrum of the Hann windowed frames"""
+
+    def __init__(self, sample_rate, block_size, **kwargs):
+        super().__init__(sample_rate, block_size, **kwargs)
+        self.bin_hz = sample_rate / block_size
+        self.window = np.hanning(block_size)
+        # Work buffers, grown to the largest batch
+        self.windowed = np.zeros((0, block_size))
+        self.spectrum = np.zeros((0, block_size // 2 + 1), dtype=np.complex128)
+        self.mag = np.zeros((0, block_size // 2 + 1))
+
+    def magnitude(self, frames):
+        n_frames = len(frames)
+        if len(self.windowed) < n_frames:
+            self.windowed = np.zeros((n_frames, self.block_size))
+            self.spectrum = np.zeros(
+                (n_frames, self.block_size // 2 + 1), dtype=np.complex128
+            )
+            self.mag = np.zeros((n_frames, self.block_size // 2 + 1))
+        windowed = np.multiply(frames, self.window, out=self.windowed[:n_frames])
+        if RFFT_HAS_OUT:
+            spectrum = np.fft.rfft(windowed, axis=1, out=self.spectrum[:n_frames])
+        else:
+            spectrum = np.fft.rfft(windowed, axis=1)
+        mag = np.abs(spectrum, out=self.mag[:n_frames])
+        mag[:, 0] = 0.0
+        return mag
+
+
+class PeakEstimator(SpectrumEstimator):
+    """Strongest FFT bin, refined by parabolic interpolation"""
+
+    name = "peak"
+
+    def estimate(self, frames):
+        mag = self.magnitude(frames)
+        peak_idx = np.argmax(mag, axis=1)
+        refined_idx, refined_mag = parabolic_interpolation_rows(mag, peak_idx)
+        freq = refined_idx * self.bin_hz
+        freq[peak_idx <= 0] = np.nan
+        return freq, refined_mag
+
+
+class HPSEstimator(SpectrumEstimator):
+    """Harmonic product spectrum: the bin whose harmonics are strong together.
+
+    The logarithms are taken of the spectrum relative to its peak, clipped at
+    `floor`, so that a missing harmonic costs a bounded penalty. The winner
+    bounds which harmonic the strongest bin may be: the pitch is that bin
+    divided by the harmonic number, and a lower pitch is only accepted when
+    the spectrum there reaches `subharmonic_ratio` of the strongest bin.
+    """
+
+    name = "hps"
+    harmonics = 5
+    floor = 1e-2
+    subharmonic_ratio = 0.2
+
+    def estimate(self, frames):
+        mag = self.magnitude(frames)
+        rows = np.arange(len(mag))
+        n_bins = mag.shape[1] // self.harmonics
+
+        peak = mag.max(axis=1, keepdims=True)
+        relative = np.zeros_like(mag)
+        np.divide(mag, peak, out=relative, where=peak > 0)
+        log_mag = np.log(np.maximum(relative, self.floor))
+        hps = log_mag[:, :n_bins].copy()
+        for h in range(2, self.harmonics + 1):
+            hps += log_mag[:, ::h][:, :n_bins]
+
+        lo = max(1, int(self.min_freq / self.bin_hz))
+        hi = min(n_bins, int(self.max_freq / self.bin_hz) + 1)
+        hps_idx = lo + np.argmax(hps[:, lo:hi], axis=1)
+
+        peak_idx = np.argmax(mag, axis=1)
+        refined_idx = refine_peak(mag, peak_idx)
+        # The decimated spectrum misses harmonics that fall between bins, so
+        # the winner may be an octave above the pitch but hardly ever below
+        max_harmonic = 2 * np.round(refined_idx / hps_idx)
+
+        # Magnitude of the spectral peak at every subharmonic of the strongest
+        # bin, leaving out the flanks of a neighbouring peak
+        harmonic = np.arange(1, self.harmonics + 1)
+        position = refined_idx[:, None] / harmonic
+        candidate_mag = np.zeros(position.shape)
+        for offset in (0, 1):
+            bins = np.clip(np.floor(position).astype(int) + offset, 1, mag.shape[1] - 2)
+            here = mag[rows[:, None], bins]
+            is_peak = (here >= mag[rows[:, None], bins - 1]) & (
+                here >= mag[rows[:, None], bins + 1]
+            )
+            np.maximum(candidate_mag, np.where(is_peak, here, 0.0), out=candidate_mag)
+        accepted = (candidate_mag >= self.subharmonic_ratio * peak) & (
+            position >= self.min_freq / self.bin_hz
+        )
+        accepted &= harmonic <= max_harmonic[:, None]
+        accepted[:, 0] = True
+        # The highest accepted harmonic number, that is the lowest pitch
+        n = self.harmonics - np.argmax(accepted[:, ::-1], axis=1)
+
+        freq = refined_idx / n * self.bin_hz
+        strength = mag[rows, peak_idx]
+        freq[(strength <= 0) | (freq > self.max_freq)] = np.nan
+        return freq, strength
+
+
+class LagEstimator(PitchEstimator):
+    """Time domain estimators, built on the autocorrelation of the frames"""
+
+    def __init__(self, sample_rate, block_size, **kwargs):
+        super().__init__(sample_rate, block_size, **kwargs)
+        # Zero padded to avoid circular wrap-around
+        self.n_fft = 1 << (2 * block_size - 1).bit_length()
+        self.min_lag = max(2, int(sample_rate / self.max_freq))
+        self.max_lag = min(block_size // 2, int(np.ceil(sample_rate / self.min_freq)))
+
+    def autocorrelation(self, frames):
+        """r[:, tau] = sum_j x[j] * x[j + tau], for tau in [0, max_lag + 1]"""
+        spectrum = np.fft.rfft(frames, n=self.n_fft, axis=1)
+        power = spectrum.real**2 + spectrum.imag**2
+        return np.fft.irfft(power, n=self.n_fft, axis=1)[:, : self.max_lag + 2]
+
+    def lag_energies(self, frames):
+        """Energies of x[:N - tau] and x[tau:], for tau in [0, max_lag + 1]"""
+        cumsum = np.zeros((len(frames), self.block_size + 1))
+        np.cumsum(frames * frames, axis=1, out=cumsum[:, 1:])
+        lags = np.arange(self.max_lag + 2)
+        head = cumsum[:, self.block_size - lags]
+        tail = cumsum[:, -1:] - cumsum[:, lags]
+        return head, tail
+
+
+class AutocorrEstimator(LagEstimator):
+    """Normalized autocorrelation: the first peak close to the highest one"""
+
+    name = "acf"
+    peak_ratio = 0.9
+
+    def estimate(self, frames):
+        r = self.autocorrelation(frames)
+        head, tail = self.lag_energies(frames)
+        nsdf = np.zeros_like(r)
+        np.divide(2 * r, head + tail, out=nsdf, where=head + tail > 0)
+
+        lo, hi = self.min_lag, self.max_lag + 1
+        values = nsdf[:, lo:hi]
+        is_peak = (values > nsdf[:, lo - 1 : hi - 1]) & (
+            values >= nsdf[:, lo + 1 : hi + 1]
+        )
+        best = np.where(is_peak, values, -np.inf).max(axis=1)
+        lag, found = first_true(is_peak & (values >= self.peak_ratio * best[:, None]))
+        lag += lo
+
+        freq = self.sample_rate / refine_peak(nsdf, lag)
+        freq[~found | (best <= 0)] = np.nan
+        return freq, nsdf[np.arange(len(nsdf)), lag]
+
+
+class YINEstimator(LagEstimator):
+    """YIN: the first dip of the cumulative mean normalized difference"""
+
+    name = "yin"
+    threshold = 0.15
+
+    def estimate(self, frames):
+        r = self.autocorrelation(frames)
+        head, tail = self.lag_energies(frames)
+        diff = np.maximum(head + tail - 2 * r, 0.0)
+
+        cmnd = np.ones_like(diff)
+        cumulative = np.cumsum(diff[:, 1:], axis=1)
+        lags = np.arange(1, diff.shape[1])
+        np.divide(diff[:, 1:] * lags, cumulative, out=cmnd[:, 1:], where=cumulative > 0)
+
+        lo, hi = self.min_lag, self.max_lag + 1
+        values = cmnd[:, lo:hi]
+        dip = (values < self.threshold) & (values <= cmnd[:, lo + 1 : hi + 1])
+        lag, found = first_true(dip)
+        # Without a dip under the threshold, take the global minimum
+        lag = np.where(found, lag, np.argmin(values, axis=1)) + lo
+
+        freq = self.sample_rate / refine_peak(-cmnd, lag)
+        strength = 1.0 - cmnd[np.arange(len(cmnd)), lag]
+        freq[strength <= 0] = np.nan
+        return freq, strength
+
+
+ESTIMATORS = {
+    cls.name: cls
+    for cls in (PeakEstimator, HPSEstimator, AutocorrEstimator, YINEstimator)
+}
+
+
 # --------------------------------------------------------------
 # Main class
 # --------------------------------------------------------------
@@ -52,24 +319,47 @@ class RealtimeFFTPitchDetector:
     def __init__(
         self,
         settings_json_path,
+        sample_rate=None,
     ):
         self.s = settings_loader.load(settings_json_path)
-        self.sample_rate = self.s.DEFAULT_SAMPLE_RATE
+        self.sample_rate = sample_rate or self.s.DEFAULT_SAMPLE_RATE
         self.block_size = self.s.DEFAULT_BLOCK_SIZE
+        # A window of block_size samples is analysed every hop_size samples
+        self.hop_size = self.s.DEFAULT_HOP_SIZE
+        if not 0 < self.hop_size <= self.block_size:
+            self.hop_size = self.block_size
         self.channels = self.s.DEFAULT_CHANNELS
         self.rms_threshold = self.s.RMS_THRESHOLD
 
-        self.window = np.hanning(self.block_size)
-        self.audio_queue = queue.Queue(maxsize=8)
+        if self.s.PITCH_ESTIMATOR in ESTIMATORS:
+            estimator = ESTIMATORS[self.s.PITCH_ESTIMATOR]
+        else:
+            print("Unknown PITCH_ESTIMATOR:", self.s.PITCH_ESTIMATOR)
+            estimator = PeakEstimator
+        self.estimator = estimator(self.sample_rate, self.block_size)
+        # MIC_INPUT_OFFSET corrects the bias of the FFT peak; the other
+        # estimators interpolate the fundamental itself
+        self.midi_offset = (
+            self.s.MIC_INPUT_OFFSET if estimator is PeakEstimator else 0.0
+        )
+
+        self.audio_queue = queue.Queue(maxsize=8 * (self.block_size // self.hop_size))
         self.stop_event = threading.Event()
 
         self.stream = None
+        self._reset_analysis()
 
-        # latest processed info
-        self.latest_freq = None
-        self.latest_mag = None
-        self.latest_rms = 0
-        self.latest_time = 0
+    def _reset_analysis(self):
+        # Sample history; the next window ends at history[next_end]. Every
+        # batch keeps only the samples the following windows still need.
+        self.history = np.zeros(2 * self.block_size)
+        self.fill = self.block_size
+        self.next_end = self.block_size + self.hop_size
+        # Samples pushed since the start, i.e. stream position of history[fill]
+        self.samples_pushed = 0
+
+        # latest processed info, replaced as a whole by the processing thread
+        self.latest = PitchSnapshot()
 
     # ---------------------- Audio callback ----------------------
     def _audio_callback(self, indata, frames, time_info, status):
@@ -82,36 +372,78 @@ class RealtimeFFTPitchDetector:
             pass
 
     # ---------------------- Processing --------------------------
-    def _process_block(self, block):
-        if len(block) < self.block_size:
-            block = np.pad(block, (0, self.block_size - len(block)))
+    def _push_samples(self, samples):
+        """Add samples to the history and analyse every window completed"""
+        n = len(samples)
+        if self.fill + n > len(self.history):
+            grown = np.zeros(max(2 * len(self.history), self.fill + n))
+            grown[: self.fill] = self.history[: self.fill]
+            self.history = grown
+        self.history[self.fill : self.fill + n] = samples
+        self.fill += n
+        self.samples_pushed += n
+
+        n_frames = (self.fill - self.next_end) // self.hop_size + 1
+        if n_frames <= 0:
+            return
+        # Windows ending at next_end, next_end + hop_size, ... as one strided view
+        start = self.next_end - self.block_size
+        frames = np.lib.stride_tricks.sliding_window_view(
+            self.history[start : self.fill], self.block_size
+        )[:: self.hop_size][:n_frames]
+        freq, mag, rms = self._process_frames(frames)
+        last_end = self.next_end + (n_frames - 1) * self.hop_size
+        end_sample = self.samples_pushed - (self.fill - last_end)
+        self._publish(freq[-1], mag[-1], rms[-1], n_frames, end_sample)
 
-        windowed = block * self.window
-        fft = np.fft.rfft(windowed)
-        mag = np.abs(fft)
-        mag[0] = 0.0
+        # Keep the samples of the next window only
+        self.next_end += n_frames * self.hop_size
+        shift = self.next_end - self.block_size
+        self.history[: self.fill - shift] = self.history[shift : self.fill]
+        self.fill -= shift
+        self.next_end -= shift
 
-        rms = float(np.sqrt(np.mean(block * block)))
-        if rms < self.rms_threshold:
-            return None, None, rms
+    def _publish(self, freq, mag, rms, n_frames, end_sample):
+        self.latest = PitchSnapshot(
+            freq=freq,
+            mag=mag,
+            rms=rms,
+            time=self._timestamp(end_sample),
+            seq=self.latest.seq + n_frames,
+        )
 
-        peak_idx = int(np.argmax(mag))
-        if peak_idx <= 0:
-            return None, None, rms
+    def _timestamp(self, end_sample):
+        """Time of the analysis of the window ending at stream sample `end_sample`"""
+        return time.time()
 
-        refined_idx, refined_mag = parabolic_interpolation(mag, peak_idx)
-        freq = refined_idx * (self.sample_rate / self.block_size)
-        return freq, refined_mag, rms
+    def _process_frames(self, frames):
+        """Frequency, strength and RMS of every row of `frames`.
+
+        Frequency and strength are None where the frame is below the RMS
+        threshold or has no pitch.
+        """
+        rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / self.block_size)
+        freq, strength = self.estimator.estimate(frames)
+
+        voiced = (rms >= self.rms_threshold) & ~np.isnan(freq)
+        return (
+            [f if v else None for f, v in zip(freq.tolist(), voiced.tolist())],
+            [m if v else None for m, v in zip(strength.tolist(), voiced.tolist())],
+            rms.tolist(),
+        )
 
     # ---------------------- Public API --------------------------
     def start(self):
         if self.stream is not None:
             return
         try:
+            # Imported here so that the module works without PortAudio
+            import sounddevice as sd
+
             self.stream = sd.InputStream(
                 channels=self.channels,
                 samplerate=self.sample_rate,
-                blocksize=self.block_size,
+                blocksize=self.hop_size,
                 callback=self._audio_callback,
             )
             self.stream.start()
@@ -137,19 +469,24 @@ class RealtimeFFTPitchDetector:
     def _processing_loop(self):
         while not self.stop_event.is_set():
             try:
-                block = self.audio_queue.get(timeout=0.05)
+                blocks = [self.audio_queue.get(timeout=0.05)]
             except queue.Empty:
                 continue
 
-            freq, mag, rms = self._process_block(block)
-            self.latest_freq = freq
-            self.latest_mag = mag
-            self.latest_rms = rms
-            self.latest_time = time.time()
+            # Analyse everything queued so far in one batch
+            while True:
+                try:
+                    blocks.append(self.audio_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._push_samples(np.concatenate(blocks))
 
     def get_latest(self):
-        freq = self.latest_freq
-        midi = freq_to_midi(freq) + self.s.MIC_INPUT_OFFSET if freq else None
+        return self._describe(self.latest)
+
+    def _describe(self, latest):
+        freq = latest.freq
+        midi = freq_to_midi(freq) + self.midi_offset if freq else None
         note_name = midi_to_note_name(self.s, midi) if midi else None
 
         return {
@@ -157,7 +494,118 @@ class RealtimeFFTPitchDetector:
             "midi": midi,
             "note_name": note_name,
             "octave": (int(round(midi)) // 12 - 1) if midi else None,
-            "rms": self.latest_rms,
-            "peak_mag": self.latest_mag,
-            "timestamp": self.latest_time,
+            "rms": latest.rms,
+            "peak_mag": latest.mag,
+            "timestamp": latest.time,
+            "seq": latest.seq,
         }
+
+
+class WavReplayPitchDetector(RealtimeFFTPitchDetector):
+    """Feeds a recorded WAV file through the detector instead of the microphone.
+
+    Without `clock`, start() streams the file from a thread at `speed` times
+    real time, like the sound device would. With `clock`, a callable returning
+    the playback time in seconds, nothing runs in the background: get_latest()
+    first analyses the file up to clock(), so the results only depend on the
+    times asked for. Snapshot times are positions in the file in seconds.
+    """
+
+    def __init__(self, settings_json_path, wav_path, speed=1.0, clock=None):
+        self.samples, sample_rate = read_wav(wav_path)
+        super().__init__(settings_json_path, sample_rate=sample_rate)
+        self.speed = speed
+        self.clock = clock
+        self.position = 0
+
+    def _timestamp(self, end_sample):
+        return end_sample / self.sample_rate
+
+    def _stream_position(self, t):
+        return min(max(int(t * self.sample_rate), 0), len(self.samples))
+
+    def advance_to(self, t):
+        """Analyse the file up to `t` seconds; going back restarts from the top"""
+        end = self._stream_position(t)
+        if end < self.position:
+            self._reset_analysis()
+            self.position = 0
+        # Bounded batches keep the work buffers small after a seek
+        step = 64 * self.hop_size
+        while self.position < end:
+            n = min(step, end - self.position)
+            self._push_samples(self.samples[self.position : self.position + n])
+            self.position += n
+
+    def analyse_file(self, batch_frames=256):
+        """get_latest() of every window of the file, in order.
+
+        These are the windows the stream would analyse, without the threads
+        and the queue, so every result is kept and not only the latest one.
+        """
+        padded = np.concatenate([np.zeros(self.block_size), self.samples])
+        # Window k >= 1 ends at stream sample k * hop_size
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.block_size)[
+            self.hop_size :: self.hop_size
+        ]
+        results = []
+        for i in range(0, len(frames), batch_frames):
+            freq, mag, rms = self._process_frames(frames[i : i + batch_frames])
+            for f, m, r in zip(freq, mag, rms):
+                seq = len(results) + 1
+                snapshot = PitchSnapshot(
+                    freq=f,
+                    mag=m,
+                    rms=r,
+                    time=self._timestamp(seq * self.hop_size),
+                    seq=seq,
+                )
+                results.append(self._describe(snapshot))
+        return results
+
+    def results_at(self, times):
+        """What get_latest() returns with clock() at each of `times`.
+
+        That is the last window ending at or before the time, from one pass
+        of analyse_file() over the file.
+        """
+        results = self.analyse_file()
+        empty = self._describe(PitchSnapshot())
+        latest = []
+        for t in times:
+            n_windows = self._stream_position(t) // self.hop_size
+            latest.append(results[n_windows - 1] if n_windows > 0 else empty)
+        return latest
+
+    def start(self):
+        if self.clock is not None:
+            return
+        self.stop_event.clear()
+        self.feeder = threading.Thread(target=self._feeding_loop, daemon=True)
+        self.feeder.start()
+        self.thread = threading.Thread(target=self._processing_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _feeding_loop(self):
+        t0 = time.perf_counter()
+        while not self.stop_event.is_set() and self.position < len(self.samples):
+            chunk = self.samples[self.position : self.position + self.hop_size]
+            due = (self.position + len(chunk)) / self.sample_rate / self.speed
+            delay = t0 + due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            while not self.stop_event.is_set():
+                try:
+                    self.audio_queue.put(chunk, timeout=0.05)
+                    break
+                except queue.Full:
+                    continue
+            self.position += len(chunk)
+
+    def get_latest(self):
+        if self.clock is not None:
+            self.advance_to(self.clock())
+        return super().get_latest()
@@ -4,11 +4,12 @@ import pygame
 import os
 import sys
 from datetime import datetime
-from tkinter import messagebox
 
 
 class PipeFrameRecorder:
-    def __init__(self):
+    def __init__(self, notify=True):
+        # Show a message box when the recording is finished
+        self.notify = notify
         self.proc = None
         self.fps = None
         self.width = None
@@ -149,11 +150,17 @@ class PipeFrameRecorder:
         return True
 
     def finish(self):
+        """Close the pipe and wait for ffmpeg; returns its exit code"""
+        returncode = None
         if self.proc:
             try:
                 self.proc.stdin.close()
-                self.proc.wait()
+                returncode = self.proc.wait()
             finally:
                 self.proc = None
                 self.is_recording = False
-                messagebox.showinfo("info", f"Recording finished:\n{self.out_path}")
+                if self.notify:
+                    from tkinter import messagebox
+
+                    messagebox.showinfo("info", f"Recording finished:\n{self.out_path}")
+        return returncode
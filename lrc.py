@@ -20,10 +20,15 @@ def generate_lyrics(
     input_lrc_path,
     settings_path,
     json_output_path=None,
+    glyph_cache_path=lyrics.text_tools.GLYPH_CACHE_PATH,
 ):
     with open(settings_path, "r", encoding=detect_encoding(settings_path)) as f:
         settings = json.load(f, object_hook=lyrics.DotDict)
 
+    # Glyph metrics measured for earlier songs
+    if glyph_cache_path is not None:
+        lyrics.text_tools.load_glyph_cache(glyph_cache_path)
+
     output_dir = (
         f"./lyrics_images/{os.path.splitext(os.path.basename(input_lrc_path))[0]}/"
     )
@@ -100,6 +105,9 @@ def generate_lyrics(
             with open(json_output_path, "w", encoding="utf-8") as f:
                 json.dump(lyrics_data, f, ensure_ascii=False, indent=4)
 
+    if glyph_cache_path is not None:
+        lyrics.text_tools.save_glyph_cache(glyph_cache_path)
+
     return lyrics_data
 
 
@@ -1,8 +1,17 @@
+import functools
+import json
 import os
 import unicodedata
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
+GLYPH_CACHE_PATH = "./data/cache/glyph_metrics.json"
+GLYPH_CACHE_VERSION = 1
+
+# (font path, font size, character) -> (bbox[0], bbox[1], bbox[2], bbox[3], width)
+_glyph_metrics = {}
+_glyph_metrics_dirty = False
+
 
 def get_width_count(text):
     """全角文字を考慮して、文字列の表示幅を計算します。"""
@@ -15,6 +24,99 @@ def get_width_count(text):
     return count
 
 
+@functools.lru_cache(maxsize=None)
+def load_font(font_path, font_size):
+    return ImageFont.truetype(font_path, font_size)
+
+
+def _font_stamp(font_path):
+    try:
+        stat = os.stat(font_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_glyph_cache(path=GLYPH_CACHE_PATH):
+    """`path` に保存された文字の寸法をメモリ上のキャッシュに読み込みます（保存後に変更されたフォントの分は読み込みません）。"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return
+    if cache.get("version") != GLYPH_CACHE_VERSION:
+        return
+
+    for font_path, font in cache["fonts"].items():
+        if font["stamp"] != _font_stamp(font_path):
+            continue
+        for font_size, glyphs in font["glyphs"].items():
+            for text, metrics in glyphs.items():
+                _glyph_metrics.setdefault(
+                    (font_path, int(font_size), text), tuple(metrics)
+                )
+
+
+def save_glyph_cache(path=GLYPH_CACHE_PATH):
+    """読み込み後に新しく測った文字があれば、キャッシュを `path` に保存します。"""
+    global _glyph_metrics_dirty
+    if not _glyph_metrics_dirty:
+        return
+
+    fonts = {}
+    for (font_path, font_size, text), metrics in _glyph_metrics.items():
+        if font_path not in fonts:
+            fonts[font_path] = {"stamp": _font_stamp(font_path), "glyphs": {}}
+        glyphs = fonts[font_path]["glyphs"].setdefault(str(font_size), {})
+        glyphs[text] = list(metrics)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a private file first so concurrent runs never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": GLYPH_CACHE_VERSION, "fonts": fonts}, f, ensure_ascii=False
+        )
+    os.replace(tmp_path, path)
+    _glyph_metrics_dirty = False
+
+
+def measure_glyph(text, font_path, font_size):
+    """文字のバウンディングボックスと描画部分の幅を返します（フォントのパス、サイズ、文字ごとにキャッシュします）。"""
+    global _glyph_metrics_dirty
+    key = (font_path, font_size, text)
+    metrics = _glyph_metrics.get(key)
+    if metrics is None:
+        image = Image.new(
+            "RGBA", (font_size + 100, font_size + 100), (255, 255, 255, 0)
+        )
+        draw = ImageDraw.Draw(image)
+        font = load_font(font_path, font_size)
+        draw.text((0, 0), text, font=font, fill=(255, 0, 0, 255))
+        bbox = list(draw.textbbox((0, 0), text, font=font))
+
+        image_np = np.array(image)
+        red_pixels = np.where(
+            (image_np[:, :, 0] == 255)
+            & (image_np[:, :, 1] == 0)
+            & (image_np[:, :, 2] == 0)
+        )
+        if red_pixels[1].size > 0:
+            leftmost_x = np.min(red_pixels[1])
+            rightmost_x = np.max(red_pixels[1])
+            bbox[0] = leftmost_x
+            bbox[2] = rightmost_x
+            _width = rightmost_x - leftmost_x
+        else:
+            _width = bbox[2] - bbox[0]
+
+        metrics = tuple(int(v) for v in bbox) + (int(_width),)
+        _glyph_metrics[key] = metrics
+        _glyph_metrics_dirty = True
+        del image
+    return list(metrics[:4]), metrics[4]
+
+
 def get_width_from_text(text, settings, mode="lyric", is_chorus=False):
     """フォント設定に基づいて、文字列のバウンディングボックス、幅、および余白を計算します。"""
     if mode == "lyric":
@@ -48,24 +150,7 @@ def get_width_from_text(text, settings, mode="lyric", is_chorus=False):
             text_with_min = settings.RUBY.TEXT_WIDTH_MIN
             margin_space = settings.RUBY.MARGIN_SPACE
 
-    image = Image.new("RGBA", (font_size + 100, font_size + 100), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(image)
-    font = ImageFont.truetype(font_path, font_size)
-    draw.text((0, 0), text, font=font, fill=(255, 0, 0, 255))
-    bbox = list(draw.textbbox((0, 0), text, font=font))
-
-    image_np = np.array(image)
-    red_pixels = np.where(
-        (image_np[:, :, 0] == 255) & (image_np[:, :, 1] == 0) & (image_np[:, :, 2] == 0)
-    )
-    if red_pixels[1].size > 0:
-        leftmost_x = np.min(red_pixels[1])
-        rightmost_x = np.max(red_pixels[1])
-        bbox[0] = leftmost_x
-        bbox[2] = rightmost_x
-        _width = rightmost_x - leftmost_x
-    else:
-        _width = bbox[2] - bbox[0]
+    bbox, _width = measure_glyph(text, font_path, font_size)
 
     margin = margin_full if get_width_count(text) > 1 else margin_half
     if not text != "" and _width < text_with_min:
@@ -75,7 +160,6 @@ def get_width_from_text(text, settings, mode="lyric", is_chorus=False):
         _width = 0
         margin = margin_space
 
-    del image
     return {"bbox": bbox, "margin": margin, "width": _width}
 
 
@@ -102,13 +186,16 @@ def draw_text_with_bbox(
             font_path = settings.RUBY.FONT_PATH
             stroke_size = settings.RUBY.STROKE_WIDTH
 
-    # Create an image with transparency (RGBA)
+    # Create an image with transparency (RGBA), only when it is saved
     x_base = stroke_size
-    image = Image.new(
-        "RGBA", (settings.GENERAL.WIDTH, settings.GENERAL.HEIGHT), (255, 255, 255, 0)
-    )
-    draw = ImageDraw.Draw(image)
-    font = ImageFont.truetype(font_path, font_size)
+    if output_path is not None:
+        image = Image.new(
+            "RGBA",
+            (settings.GENERAL.WIDTH, settings.GENERAL.HEIGHT),
+            (255, 255, 255, 0),
+        )
+        draw = ImageDraw.Draw(image)
+        font = load_font(font_path, font_size)
     _x_starts = []
     _x_ends = []
 
@@ -123,14 +210,15 @@ def draw_text_with_bbox(
             _bbox = _data["bbox"]
             _width = _data["width"]
             _margin = _data["margin"]
-            draw.text(
-                (x_base - _bbox[0], 100),
-                t,
-                font=font,
-                fill=(255, 255, 255, 255),
-                stroke_width=stroke_size,
-                stroke_fill=(0, 0, 0, 230),
-            )
+            if output_path is not None:
+                draw.text(
+                    (x_base - _bbox[0], 100),
+                    t,
+                    font=font,
+                    fill=(255, 255, 255, 255),
+                    stroke_width=stroke_size,
+                    stroke_fill=(0, 0, 0, 230),
+                )
             x_base += _width + _margin
 
         _x_ends.append(x_base - _margin)
@@ -579,12 +579,8 @@ class ProjectEditorApp(ctk.CTk):
 
         # Check MIDI
         mid_path = proj.get("mid_path")
-        separator_csv = f"./data/marker.csv"
-        note_csv = f"./data/note.csv"
-        mid2csv.convert(mid_path, note_csv, separator_csv)
-        with open(separator_csv, "r", encoding="utf-8") as f:
-            texts = f.readlines()
-        if len(texts) < 3:
+        midi_tables = mid2csv.convert_cached(mid_path)
+        if len(midi_tables["marker"]["tick"]) < 2:
             messagebox.showerror("Error", get_lang_text("midi_marker_error"))
             return
 
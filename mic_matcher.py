@@ -0,0 +1,160 @@
+import numpy as np
+
+from note_table import TYPE_CODES
+from pitch_math import mod12, round_pitch
+
+
+def split_range(A, B, step):
+    if B <= A:
+        return []
+
+    # 区間の端の候補を作成
+    edges = np.arange(A, B, step)
+    if edges[-1] < B:
+        edges = np.append(edges, B)
+
+    if len(edges) >= 3 and (edges[-1] - edges[-2]) < step:
+        edges = np.delete(edges, -2)
+
+    intervals = list(zip(edges[:-1], edges[1:]))
+    return intervals
+
+
+class MicNoteMatcher:
+    """Turns mic samples into mic notes against the notes of one channel.
+
+    Each target note is split into sub-intervals of `connect_duration`. A
+    sub-interval is matched once, as soon as no more samples can fall in its
+    window (sub-interval +- margin), and the cursor then moves on. Every frame
+    only looks at the sub-intervals closed since the previous one.
+    """
+
+    def __init__(
+        self,
+        notes,
+        rows,
+        samples,
+        mic_notes,
+        channel,
+        margin,
+        connect_duration,
+        tolerance,
+    ):
+        self.notes = notes
+        self.rows = np.asarray(rows).tolist()
+        self.samples = samples
+        self.mic_notes = mic_notes
+        self.channel = channel
+        self.margin = margin
+        self.connect_duration = connect_duration
+        self.tolerance = tolerance
+        self.reset()
+
+    def reset(self):
+        self.cursor = 0
+        self.split_times = None
+        self.j = 0
+        self.n = 0
+
+    def update(self, t):
+        """Match the sub-intervals closed at sample time `t`.
+
+        Returns the index of the first mic note added or changed, which is
+        len(mic_notes) when nothing changed.
+        """
+        mic_notes = self.mic_notes
+        changed = len(mic_notes)
+        while True:
+            if self.split_times is None:
+                if self.cursor >= len(self.rows):
+                    break
+                row = self.rows[self.cursor]
+                start = float(self.notes.start[row])
+                end = float(self.notes.end[row])
+                if len(mic_notes) > 0 and mic_notes.end[-1] >= end:
+                    self.cursor += 1
+                    continue
+                self.target = (
+                    start,
+                    int(self.notes.pitch[row]),
+                    int(self.notes.effects[row]),
+                )
+                self.split_times = split_range(start, end, self.connect_duration)
+                self.j = 0
+                self.n = 0
+                if not self.split_times:
+                    # Zero-length note, nothing to match
+                    self.split_times = None
+                    self.cursor += 1
+                    continue
+
+            if t <= self.split_times[self.j][1] + self.margin:
+                break
+
+            changed = min(changed, self.match_interval())
+            self.j += 1
+            if self.j == len(self.split_times):
+                self.split_times = None
+                self.cursor += 1
+        return changed
+
+    def match_interval(self):
+        """Match sub-interval j of the current target note"""
+        mic_notes = self.mic_notes
+        start, target_pitch, target_effects = self.target
+        split_times = self.split_times
+        j = self.j
+        _start, _end = split_times[j]
+
+        matched = self.samples.range(_start - self.margin, _end + self.margin)
+        if matched.start < matched.stop:
+            pitch_diffs = mod12(self.samples.midi[matched] - target_pitch)
+            input_pitch = np.mean(pitch_diffs) + target_pitch
+        else:
+            input_pitch = -j
+
+        modi_pitch = round_pitch(input_pitch, target_pitch, self.tolerance)
+
+        if (
+            len(mic_notes) > 0
+            and len(split_times) > 1
+            and j > 0
+            and mic_notes.pitch[-1] == modi_pitch
+        ):
+            mic_notes.end[-1] = _end
+            if (
+                j == len(split_times) - 1
+                and self.n == 0
+                and mic_notes.start[-1] == start
+                and modi_pitch == target_pitch
+            ):
+                # Full matched
+                mic_notes.type[-1] = TYPE_CODES["match_all"]
+                mic_notes.effects[-1] = target_effects
+            return len(mic_notes) - 1
+
+        elif input_pitch > 0:
+            if len(split_times) == 1 and target_pitch == modi_pitch:
+                typ = "match_all"
+                effects = target_effects
+            elif target_pitch == modi_pitch:
+                typ = "match"
+                effects = 0
+            else:
+                typ = "unmatch"
+                effects = 0
+
+            if len(mic_notes) == 0 or mic_notes.end[-1] <= _start:
+                mic_notes.append(
+                    start=_start,
+                    end=_end,
+                    pitch=modi_pitch,
+                    pitch_org=input_pitch,
+                    channel=self.channel,
+                    type=TYPE_CODES[typ],
+                    effects=effects,
+                )
+                self.n += 1
+                return len(mic_notes) - 1
+
+        return len(mic_notes)
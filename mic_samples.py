@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class MicSampleBuffer:
+    """Voiced mic samples (time, midi, rms) kept sorted by time.
+
+    The columns are preallocated NumPy arrays that grow geometrically, so
+    appending a sample is amortized O(1). `range` finds the samples of a time
+    interval with `searchsorted` instead of masking the whole history.
+    """
+
+    def __init__(self, capacity=4096):
+        self._size = 0
+        self._time = np.zeros(capacity)
+        self._midi = np.zeros(capacity)
+        self._rms = np.zeros(capacity)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def time(self):
+        return self._time[: self._size]
+
+    @property
+    def midi(self):
+        return self._midi[: self._size]
+
+    @property
+    def rms(self):
+        return self._rms[: self._size]
+
+    def clear(self):
+        self._size = 0
+
+    def append(self, time, midi, rms):
+        if self._size == len(self._time):
+            capacity = max(16, self._size * 2)
+            for name in ("_time", "_midi", "_rms"):
+                grown = np.zeros(capacity)
+                grown[: self._size] = getattr(self, name)[: self._size]
+                setattr(self, name, grown)
+
+        i = self._size
+        if i > 0 and time < self._time[i - 1]:
+            # Out of order sample: insert it after the samples at the same time
+            i = int(np.searchsorted(self.time, time, side="right"))
+            for data in (self._time, self._midi, self._rms):
+                data[i + 1 : self._size + 1] = data[i : self._size]
+        self._time[i] = time
+        self._midi[i] = midi
+        self._rms[i] = rms
+        self._size += 1
+
+    def range(self, start, end):
+        """Slice of the samples with start <= time <= end"""
+        lo = int(np.searchsorted(self.time, start, side="left"))
+        hi = int(np.searchsorted(self.time, end, side="right"))
+        return slice(lo, max(lo, hi))
+
+
+def mic_frame_times(fps, title_duration, duration):
+    """Times at which the player reads the detector.
+
+    Frame k shows the time k / fps. The detector is read on the frames after
+    the title (`title_duration`) until the end of the song (`duration`).
+    """
+    times = np.arange(int(np.ceil(duration * fps))) / fps
+    return times[(times > title_duration) & (times < duration)]
+
+
+def add_mic_sample(samples, result, sample_time, rms_threshold):
+    """Append a detector result (see get_latest) to `samples` if it is voiced"""
+    if result["rms"] >= rms_threshold and result["midi"] is not None:
+        samples.append(sample_time, result["midi"], result["rms"])
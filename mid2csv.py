@@ -1,7 +1,102 @@
 import py_midicsv as pm
 import argparse
+import bisect
+import hashlib
+import json
+import mido
+import numpy as np
 import pandas as pd
 import os
+import struct
+
+PITCH_NAMES_NORMAL = np.array(
+    ["C", "C#", "D", "Eb", "E", "F", "F#", "G", "G#", "A", "Bb", "B"]
+)
+PITCH_NAMES_SHARP = np.array(
+    ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+)
+PITCH_NAMES_FLAT = np.array(
+    ["C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B"]
+)
+
+# Bump whenever the converted tables change, so that cached results are rebuilt
+CONVERTER_VERSION = 2
+CACHE_DIR = "./data/cache"
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Columns of the converted tables, in CSV order
+NOTE_COLUMNS = [
+    "tick_on",
+    "tick_off",
+    "beat_on",
+    "beat_off",
+    "start",
+    "end",
+    "octave",
+    "name",
+    "pitch",
+    "channel",
+]
+TEXT_COLUMNS = ["tick", "time", "time_str", "beat", "text"]
+TEMPO_COLUMNS = [
+    "beat",
+    "tick",
+    "numerator",
+    "denominator",
+    "bar_ticks",
+    "bpm",
+    "key",
+    "scale",
+    "time",
+]
+
+# Binary tables file: header struct, JSON column index, then 64-byte aligned columns
+TABLES_MAGIC = b"M2BTABLE"
+TABLES_FORMAT_VERSION = 1
+TABLES_HEADER = struct.Struct("<8sII")  # magic, format version, index length
+TABLES_ALIGN = 64
+
+# Event type codes of the EVENT_DTYPE records
+EVENT_NOTE_ON = 1
+EVENT_NOTE_OFF = 2
+EVENT_TEMPO = 3
+EVENT_TIME_SIGNATURE = 4
+EVENT_KEY_SIGNATURE = 5
+EVENT_TEXT = 6
+EVENT_MARKER = 7
+EVENT_END_TRACK = 8  # End of the last track only
+
+# value: velocity (notes), usec per quarter note (tempo), numerator (time
+#        signature), sharps/flats (key signature) or index into the text list
+# aux:   log2 of the denominator (time signature), 1 for minor keys
+EVENT_DTYPE = np.dtype(
+    [
+        ("tick", np.int64),
+        ("type", np.int8),
+        ("channel", np.int8),
+        ("pitch", np.int16),
+        ("value", np.int64),
+        ("aux", np.int16),
+    ]
+)
+
+_MAJOR_KEYS = "Cb Gb Db Ab Eb Bb F C G D A E B F# C#".split()
+_MINOR_KEYS = "Ab Eb Bb F C G D A E B F# C# G# D# A#".split()
+KEY_SIGNATURES = {
+    **{key: (i - 7, 0) for i, key in enumerate(_MAJOR_KEYS)},
+    **{f"{key}m": (i - 7, 1) for i, key in enumerate(_MINOR_KEYS)},
+}
+
+_CSV_EVENT_TYPES = {
+    "Note_on_c": EVENT_NOTE_ON,
+    "Note_off_c": EVENT_NOTE_OFF,
+    "Tempo": EVENT_TEMPO,
+    "Time_signature": EVENT_TIME_SIGNATURE,
+    "Key_signature": EVENT_KEY_SIGNATURE,
+    "Text_t": EVENT_TEXT,
+    "Marker_t": EVENT_MARKER,
+    "End_track": EVENT_END_TRACK,
+}
 
 
 def midi_to_csv(input_path):
@@ -15,6 +110,102 @@ def midi_to_csv(input_path):
     return df
 
 
+def csv_to_events(df):
+    """Convert the py_midicsv DataFrame of `midi_to_csv` into event records."""
+    records = []
+    texts = []
+    ticks_per_beat = 0
+
+    for row in df.itertuples(index=False):
+        typ = row[2]
+        if typ == "Header":
+            ticks_per_beat = int(row[5])
+            continue
+
+        code = _CSV_EVENT_TYPES.get(typ)
+        if code is None:
+            continue
+
+        tick = int(row[1])
+        if code in (EVENT_NOTE_ON, EVENT_NOTE_OFF):
+            records.append((tick, code, int(row[3]), int(row[4]), int(row[5]), 0))
+        elif code == EVENT_TEMPO:
+            records.append((tick, code, 0, 0, int(row[3]), 0))
+        elif code == EVENT_TIME_SIGNATURE:
+            records.append((tick, code, 0, 0, int(row[3]), int(row[4])))
+        elif code == EVENT_KEY_SIGNATURE:
+            records.append((tick, code, 0, 0, int(row[3]), int(row[4] == "minor")))
+        elif code in (EVENT_TEXT, EVENT_MARKER):
+            records.append((tick, code, 0, 0, len(texts), 0))
+            texts.append(row[3])
+        else:
+            records.append((tick, code, 0, 0, 0, 0))
+
+    return np.array(records, dtype=EVENT_DTYPE), texts, ticks_per_beat
+
+
+def midi_to_events(input_path):
+    """Read a MIDI file with mido directly into event records.
+
+    Events are emitted track by track in file order, like py_midicsv does.
+    Returns (events, texts, ticks_per_beat).
+    """
+    mid = mido.MidiFile(input_path, clip=True)
+    records = []
+    texts = []
+    end_tick = None
+
+    for track in mid.tracks:
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            typ = msg.type
+            if typ == "note_on" and msg.velocity > 0:
+                records.append(
+                    (tick, EVENT_NOTE_ON, msg.channel, msg.note, msg.velocity, 0)
+                )
+            elif typ == "note_on" or typ == "note_off":
+                records.append(
+                    (tick, EVENT_NOTE_OFF, msg.channel, msg.note, msg.velocity, 0)
+                )
+            elif typ == "set_tempo":
+                records.append((tick, EVENT_TEMPO, 0, 0, msg.tempo, 0))
+            elif typ == "time_signature":
+                records.append(
+                    (
+                        tick,
+                        EVENT_TIME_SIGNATURE,
+                        0,
+                        0,
+                        msg.numerator,
+                        msg.denominator.bit_length() - 1,
+                    )
+                )
+            elif typ == "key_signature":
+                key, minor = KEY_SIGNATURES[msg.key]
+                records.append((tick, EVENT_KEY_SIGNATURE, 0, 0, key, minor))
+            elif typ == "text" or typ == "marker":
+                code = EVENT_TEXT if typ == "text" else EVENT_MARKER
+                records.append((tick, code, 0, 0, len(texts), 0))
+                texts.append(msg.text)
+            elif typ == "end_of_track":
+                end_tick = tick
+
+    if end_tick is not None:
+        records.append((end_tick, EVENT_END_TRACK, 0, 0, 0, 0))
+
+    return np.array(records, dtype=EVENT_DTYPE), texts, mid.ticks_per_beat
+
+
+def read_events(input_path, parser="mido"):
+    """Read MIDI events with the native mido reader or the legacy py_midicsv one."""
+    if parser == "mido":
+        return midi_to_events(input_path)
+    elif parser == "midicsv":
+        return csv_to_events(midi_to_csv(input_path))
+    raise ValueError(f"Unknown MIDI parser: {parser}")
+
+
 def get_time(x):
     m = int(x // 60)
     s = x - (m * 60)
@@ -23,46 +214,169 @@ def get_time(x):
     return f"{m:0d}:{s_f:02d}:{ss:02d}"
 
 
+def pair_notes(events):
+    """Pair each note on with the next note off of the same channel and pitch.
+
+    The events are walked once while the open notes are stacked per
+    (channel, pitch), so the cost is linear in the number of events.
+    """
+    notes = []
+    open_notes = {}
+
+    note_events = events[
+        (events["type"] == EVENT_NOTE_ON) | (events["type"] == EVENT_NOTE_OFF)
+    ]
+    for tick, typ, channel, pitch in zip(
+        note_events["tick"].tolist(),
+        note_events["type"].tolist(),
+        note_events["channel"].tolist(),
+        note_events["pitch"].tolist(),
+    ):
+        if typ == EVENT_NOTE_ON:
+            note = [tick, None, channel, pitch]
+            notes.append(note)
+            open_notes.setdefault((channel, pitch), []).append(note)
+
+        else:
+            key = (channel, pitch)
+            stack = open_notes.get(key)
+            if not stack:
+                continue
+
+            # A note-off closes every open note that started strictly before it
+            for note in stack:
+                if note[0] < tick:
+                    note[1] = tick
+            open_notes[key] = [note for note in stack if note[0] >= tick]
+
+    # Notes left open are closed at the end of the song
+    t_end = int(events["tick"].max()) if len(events) > 0 else 0
+    for note in notes:
+        if note[1] is None:
+            note[1] = t_end
+
+    return notes
+
+
+class BarTempoMap:
+    """Immutable tick -> (seconds, "bar.beat.tick") lookup for one MIDI file.
+
+    Built once from the bar/tempo rows computed by `convert`. Every lookup is a
+    binary search over the sorted change ticks instead of a linear scan.
+    """
+
+    def __init__(self, bars_tempo_time_data, ticks_per_beat):
+        labels = [data[0] for data in bars_tempo_time_data]
+        is_bar_start = np.array([".1.0" in label for label in labels], dtype=bool)
+
+        self.ticks_per_beat = ticks_per_beat
+        self.ticks = np.array([data[1] for data in bars_tempo_time_data], np.int64)
+        self.beat_n = np.array([data[2] for data in bars_tempo_time_data], np.int64)
+        self.bar_len = np.array([data[4] for data in bars_tempo_time_data], np.int64)
+        self.tempos = np.array([data[5] for data in bars_tempo_time_data], np.float64)
+        self.seconds = np.array([data[8] for data in bars_tempo_time_data], np.float64)
+        # Index of the bar start row each row belongs to
+        self.bar_start = np.maximum.accumulate(
+            np.where(is_bar_start, np.arange(len(labels)), 0)
+        )
+        self.bar_labels = [label.replace(".1.0", "") for label in labels]
+        self._tick_list = self.ticks.tolist()
+
+        for arr in (
+            self.ticks,
+            self.beat_n,
+            self.bar_len,
+            self.tempos,
+            self.seconds,
+            self.bar_start,
+        ):
+            arr.flags.writeable = False
+
+    def time(self, t_d):
+        """Return (absolute seconds, "bar.beat.tick") of a single tick."""
+        j = max(bisect.bisect_right(self._tick_list, t_d) - 1, 0)
+        j_bar = int(self.bar_start[j])
+
+        haku = (t_d - self._tick_list[j]) / self.ticks_per_beat
+        t_s_per_4 = 60.0 / float(self.tempos[j])
+        t_zettai = float(self.seconds[j]) + t_s_per_4 * haku
+
+        d_delta = t_d - self._tick_list[j_bar]
+        d_haku = int(self.bar_len[j_bar]) / int(self.beat_n[j_bar])
+        haku = int(d_delta // d_haku)
+        remain = int(d_delta - (d_haku * haku))
+
+        return t_zettai, f"{self.bar_labels[j_bar]}.{haku+1}.{remain}"
+
+    def times(self, t_ds):
+        """Vectorized `time` for an array of ticks.
+
+        Returns an array of absolute seconds and a list of "bar.beat.tick" strings.
+        """
+        t_ds = np.asarray(t_ds, dtype=np.int64)
+        j = np.maximum(np.searchsorted(self.ticks, t_ds, side="right") - 1, 0)
+        j_bar = self.bar_start[j]
+
+        haku = (t_ds - self.ticks[j]) / self.ticks_per_beat
+        t_s_per_4 = 60.0 / self.tempos[j]
+        t_zettai = self.seconds[j] + t_s_per_4 * haku
+
+        d_delta = t_ds - self.ticks[j_bar]
+        d_haku = self.bar_len[j_bar] / self.beat_n[j_bar]
+        haku = np.floor_divide(d_delta, d_haku)
+        remain = (d_delta - (d_haku * haku)).astype(np.int64)
+
+        t_hyousi = [
+            f"{self.bar_labels[b]}.{h+1}.{r}"
+            for b, h, r in zip(
+                j_bar.tolist(), haku.astype(np.int64).tolist(), remain.tolist()
+            )
+        ]
+        return t_zettai, t_hyousi
+
+
 def convert(
     input_midi_path,
     output_note_path="./data/note.csv",
     output_marker_path="./data/marker.csv",
     output_text_path="./data/text.csv",
+    parser="mido",
 ):
-    os.makedirs(os.path.dirname(output_note_path), exist_ok=True)
-    df = midi_to_csv(input_midi_path)
-    df[1] = df[1].astype(int)
+    tables = convert_tables(input_midi_path, parser)
+    write_csv(tables, output_note_path, output_marker_path, output_text_path)
+    return tables
+
+
+def convert_tables(input_midi_path, parser="mido"):
+    """Convert a MIDI file into note, marker and text tables.
+
+    Each table is a dict of equally long column arrays (NOTE_COLUMNS or
+    TEXT_COLUMNS).
+    """
+    events, texts, d = read_events(input_midi_path, parser)  # d: ticks per quarter
 
     # Convert MIDI data to custom data
-    d = 0  # Duration for a quarter note
     beat_n, beat_b = 0, 0
-    tempo = 0.0
 
     t_now_d = 0
-    t_now_s = 0.0
     t_d_1bar = 0
     bar = 0
 
     bars_data = []
 
-    # Extract info except notes
-    for idx, row in df.iterrows():
-        # ===== Header =====
-        if row[2] == "Header":
-            d = int(row[5])
-            continue
-
-        elif row[2] == "Title_t":
-            title = str(row[3])
-            continue
-
-        # ===== Content =====
-        if row[2] == "Tempo":
-            tempo = float(60 / (int(row[3]) * (10**-6)))
-
-        elif row[2] == "Time_signature":
+    # Extract bars
+    meta_events = events[
+        (events["type"] == EVENT_TIME_SIGNATURE) | (events["type"] == EVENT_END_TRACK)
+    ]
+    for tick, typ, value, aux in zip(
+        meta_events["tick"].tolist(),
+        meta_events["type"].tolist(),
+        meta_events["value"].tolist(),
+        meta_events["aux"].tolist(),
+    ):
+        if typ == EVENT_TIME_SIGNATURE:
             if t_d_1bar != 0:
-                t_delta = int(row[1]) - t_now_d
+                t_delta = tick - t_now_d
                 bars = t_delta // t_d_1bar
                 for i in range(bars):
                     bar += 1
@@ -70,14 +384,14 @@ def convert(
                         [bar, t_now_d + i * t_d_1bar, beat_n, beat_b, t_d_1bar]
                     )
 
-            beat_n = int(row[3])
-            beat_b = int(2 ** int(row[4]))
+            beat_n = value
+            beat_b = int(2**aux)
             t_d_1bar = int(d / (beat_b / 4) * beat_n)
-            t_now_d = int(row[1])
+            t_now_d = tick
 
-        elif row[2] == "End_track":
+        elif typ == EVENT_END_TRACK:
             if t_d_1bar != 0:
-                t_delta = int(row[1]) - t_now_d
+                t_delta = tick - t_now_d
                 bars = t_delta // t_d_1bar
                 for i in range(bars + 10):
                     bar += 1
@@ -85,15 +399,22 @@ def convert(
                         [bar, t_now_d + i * t_d_1bar, beat_n, beat_b, t_d_1bar]
                     )
 
-            t_now_d = int(row[1])
+            t_now_d = tick
             break
 
-    df_tempo = df[df[2] == "Tempo"].copy()
-    df_tempo["v"] = df_tempo[3].apply(lambda x: round(60 / (int(x) * (10**-6)), 2))
-    df_tempo = df_tempo[[1, "v"]].reset_index(drop=True)
-    df_tempo["next_change"] = list(df_tempo[1].values[1:]) + [9999999]
-    df_tempo["next_change"] = df_tempo["next_change"].astype(int)
-    df_tempo[1] = df_tempo[1].astype(int)
+    tempo_events = events[events["type"] == EVENT_TEMPO]
+    tempo_ticks = tempo_events["tick"].tolist()
+    tempo_values = [
+        round(60 / (v * (10**-6)), 2) for v in tempo_events["value"].tolist()
+    ]
+    tempo_next_changes = tempo_ticks[1:] + [9999999]
+
+    # Key signature changes grouped by tick
+    key_signatures = {}
+    for ev in events[events["type"] == EVENT_KEY_SIGNATURE].tolist():
+        key_signatures.setdefault(ev[0], []).append(
+            (ev[4], "minor" if ev[5] else "major")
+        )
 
     bars_tempo_data = []
     tempo = 0.0
@@ -101,12 +422,12 @@ def convert(
     chou = 0
     major = 0
 
-    for idx, tempo_data in df_tempo.iterrows():
-        t_now_d = int(tempo_data[1])
-        tempo = tempo_data["v"]
-        next_change = tempo_data["next_change"]
+    bar_ticks = set(data[1] for data in bars_data)
 
-        if not t_now_d in [data[1] for data in bars_data]:
+    for t_now_d, tempo, next_change in zip(
+        tempo_ticks, tempo_values, tempo_next_changes
+    ):
+        if not t_now_d in bar_ticks:
             for i in range(len(bars_data)):
                 if bars_data[i][1] > t_now_d:
                     bar_t = i - 1
@@ -131,18 +452,8 @@ def convert(
 
         for bar_data in bars_data:
             if t_now_d <= bar_data[1] < next_change:
-                if (
-                    len(df[(df[1] == int(bar_data[1])) & (df[2] == "Key_signature")])
-                    == 1
-                ):
-                    chou = int(
-                        df[(df[1] == int(bar_data[1])) & (df[2] == "Key_signature")][
-                            3
-                        ].values[0]
-                    )
-                    major = df[
-                        (df[1] == int(bar_data[1])) & (df[2] == "Key_signature")
-                    ][4].values[0]
+                if len(key_signatures.get(bar_data[1], [])) == 1:
+                    chou, major = key_signatures[bar_data[1]][0]
                 bars_tempo_data.append(
                     [f"{bar_data[0]}.1.0", *bar_data[1:], tempo, chou, major]
                 )
@@ -165,154 +476,223 @@ def convert(
 
         bars_tempo_time_data.append([*bars_tempo_data[i], t_now_s])
 
-    df_hyousi_and_tempo = pd.DataFrame(
-        bars_tempo_time_data,
-        columns=["拍子位置", "時間", "拍子分子", "拍子分母", "1小節長さ", "テンポ", "調", "長調/短調", "絶対時間"],
+    tempo_map = BarTempoMap(bars_tempo_time_data, d)
+
+    # ===== Notes =====
+    notes = pair_notes(events)
+    t_note_ons = np.array([n[0] for n in notes], dtype=np.int64)
+    t_note_offs = np.array([n[1] for n in notes], dtype=np.int64)
+    channels = np.array([n[2] for n in notes], dtype=np.int64)
+    pitches = np.array([n[3] for n in notes], dtype=np.int64)
+
+    t_zettai_note_ons, hyousi_note_ons = tempo_map.times(t_note_ons)
+    t_zettai_note_offs, hyousi_note_offs = tempo_map.times(t_note_offs)
+
+    # Key signature in effect at each note on
+    key_ticks = np.array([data[1] for data in bars_tempo_time_data], dtype=np.int64)
+    keys = np.array([data[6] for data in bars_tempo_time_data], dtype=np.int64)
+    chou = keys[np.searchsorted(key_ticks, t_note_ons, side="right") - 1]
+
+    pitch_classes = pitches % 12
+    pitch_names = np.select(
+        [chou > 0, chou < 0],
+        [PITCH_NAMES_SHARP[pitch_classes], PITCH_NAMES_FLAT[pitch_classes]],
+        PITCH_NAMES_NORMAL[pitch_classes],
     )
 
-    def get_times_t_d(t_d):
-        j_bar = 0
-        j = 0
-        for j in range(len(bars_tempo_time_data)):
-            if bars_tempo_time_data[j][1] > t_d:
-                j -= 1
-                j_bar = j
-                while not ".1.0" in bars_tempo_time_data[j_bar][0]:
-                    j_bar -= 1
-                break
-
-        d_delta = t_d - bars_tempo_time_data[j][1]
-        tempo = bars_tempo_time_data[j][5]
-        haku = d_delta / d
-        t_s_per_4 = 60.0 / tempo
-        time_s = t_s_per_4 * haku
+    note_table = {
+        "tick_on": t_note_ons,
+        "tick_off": t_note_offs,
+        "beat_on": np.array(hyousi_note_ons, dtype=str),
+        "beat_off": np.array(hyousi_note_offs, dtype=str),
+        "start": t_zettai_note_ons,
+        "end": t_zettai_note_offs,
+        "octave": pitches // 12 - 1,
+        "name": pitch_names,
+        "pitch": pitches,
+        "channel": channels,
+    }
+
+    tempo_table = {
+        column: np.array([data[i] for data in bars_tempo_time_data])
+        for i, column in enumerate(TEMPO_COLUMNS)
+    }
+
+    return {
+        "note": note_table,
+        "tempo": tempo_table,
+        "marker": text_table(events[events["type"] == EVENT_MARKER], texts, tempo_map),
+        "text": text_table(events[events["type"] == EVENT_TEXT], texts, tempo_map),
+    }
+
+
+def text_table(text_events, texts, tempo_map):
+    t_zettais, hyousis = tempo_map.times(text_events["tick"])
+    return {
+        "tick": text_events["tick"].astype(np.int64),
+        "time": t_zettais,
+        "time_str": np.array([get_time(t) for t in t_zettais.tolist()], dtype=str),
+        "beat": np.array(hyousis, dtype=str),
+        "text": np.array([texts[i] for i in text_events["value"].tolist()], dtype=str),
+    }
+
+
+def write_csv(
+    tables,
+    output_note_path,
+    output_marker_path,
+    output_text_path,
+    output_tempo_path=None,
+):
+    outputs = [
+        ("note", NOTE_COLUMNS, output_note_path),
+        ("marker", TEXT_COLUMNS, output_marker_path),
+        ("text", TEXT_COLUMNS, output_text_path),
+    ]
+    if output_tempo_path is not None:
+        outputs.append(("tempo", TEMPO_COLUMNS, output_tempo_path))
+
+    for name, columns, path in outputs:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        table = tables[name]
+        if len(table[columns[0]]) == 0:
+            pd.DataFrame([]).to_csv(path)
+            continue
+        pd.DataFrame({i: table[c] for i, c in enumerate(columns)}).to_csv(path)
+
+
+# ===== Conversion cache =====
+def _cache_key(input_midi_path, parser):
+    h = hashlib.sha256()
+    with open(input_midi_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(f"{CONVERTER_VERSION}:{parser}".encode())
+    return h.hexdigest()
+
+
+def _aligned(n):
+    return (n + TABLES_ALIGN - 1) // TABLES_ALIGN * TABLES_ALIGN
+
+
+def save_tables(tables, path):
+    """Write tables into a single uncompressed, memory-mappable file."""
+    columns = []
+    for name, table in tables.items():
+        for column, values in table.items():
+            values = np.ascontiguousarray(values)
+            if values.dtype.kind == "O":
+                values = values.astype(str)
+            columns.append((name, column, values))
+
+    # The index stores offsets relative to the data section
+    index = {"tables": {}}
+    offset = 0
+    for name, column, values in columns:
+        index["tables"].setdefault(name, {})[column] = {
+            "dtype": values.dtype.str,
+            "shape": list(values.shape),
+            "offset": offset,
+        }
+        offset = _aligned(offset + values.nbytes)
+    index_bytes = json.dumps(index).encode("utf-8")
+    data_start = _aligned(TABLES_HEADER.size + len(index_bytes))
+
+    # Write to a private file first so concurrent launches never see a partial entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(
+            TABLES_HEADER.pack(TABLES_MAGIC, TABLES_FORMAT_VERSION, len(index_bytes))
+        )
+        f.write(index_bytes)
+        for name, column, values in columns:
+            f.seek(data_start + index["tables"][name][column]["offset"])
+            f.write(values.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def load_tables(path, mmap=True):
+    """Read a file written by `save_tables`.
+
+    With `mmap` the columns are read-only memory maps of the file (no copy).
+    """
+    with open(path, "rb") as f:
+        magic, version, index_len = TABLES_HEADER.unpack(f.read(TABLES_HEADER.size))
+        if magic != TABLES_MAGIC:
+            raise ValueError(f"Not a MIDI tables file: {path}")
+        if version != TABLES_FORMAT_VERSION:
+            raise ValueError(f"Unsupported MIDI tables format version: {version}")
+        index = json.loads(f.read(index_len).decode("utf-8"))
+        data_start = _aligned(TABLES_HEADER.size + index_len)
+
+        tables = {}
+        for name, table in index["tables"].items():
+            tables[name] = {}
+            for column, info in table.items():
+                dtype = np.dtype(info["dtype"])
+                shape = tuple(info["shape"])
+                offset = data_start + info["offset"]
+                if int(np.prod(shape)) == 0:
+                    values = np.empty(shape, dtype=dtype)
+                elif mmap:
+                    values = np.memmap(
+                        path, dtype=dtype, mode="r", offset=offset, shape=shape
+                    )
+                else:
+                    f.seek(offset)
+                    values = np.fromfile(f, dtype=dtype, count=int(np.prod(shape)))
+                    values = values.reshape(shape)
+                tables[name][column] = values
 
-        t_zettai = bars_tempo_time_data[j][8] + time_s
+    return tables
 
-        bar = bars_tempo_time_data[j_bar][0].replace(".1.0", "")
-        d_delta = t_d - bars_tempo_time_data[j_bar][1]
-        d_haku = bars_tempo_time_data[j_bar][4] / bars_tempo_time_data[j_bar][2]
-        haku = int(d_delta // d_haku)
-        remain = int(d_delta - (d_haku * haku))
 
-        t_hyousi = f"{bar}.{haku+1}.{remain}"
-        return t_zettai, t_hyousi
+def _evict_cache(cache_dir, max_bytes, keep_path):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".m2bt") and entry.path != keep_path:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
 
-    # ===== Notes =====
-    notes_data = []
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep_path)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
 
-    for _, row in df[df[2] == "Note_on_c"].iterrows():
-        t_note_on = int(row[1])
-        channel = int(row[3])
-        pitch = int(row[4])
 
-        for _, row2 in df[df[1] > t_note_on].iterrows():
-            if int(row2[1]) <= t_note_on:
-                continue
-            elif (
-                row2[2] == "Note_off_c"
-                and int(row2[3]) == channel
-                and int(row2[4]) == pitch
-            ):
-                t_note_off = int(row2[1])
-                break
-
-        t_zettai_note_on, hyousi_note_on = get_times_t_d(t_note_on)
-        t_zettai_note_off, hyousi_note_off = get_times_t_d(t_note_off)
-
-        pi_dict_normal = {
-            0: "C",
-            1: "C#",
-            2: "D",
-            3: "Eb",
-            4: "E",
-            5: "F",
-            6: "F#",
-            7: "G",
-            8: "G#",
-            9: "A",
-            10: "Bb",
-            11: "B",
-        }
-        pi_dict_sharp = {
-            0: "C",
-            1: "C#",
-            2: "D",
-            3: "D#",
-            4: "E",
-            5: "F",
-            6: "F#",
-            7: "G",
-            8: "G#",
-            9: "A",
-            10: "A#",
-            11: "B",
-        }
-        pi_dict_flat = {
-            0: "C",
-            1: "Db",
-            2: "D",
-            3: "Eb",
-            4: "E",
-            5: "F",
-            6: "Gb",
-            7: "G",
-            8: "Ab",
-            9: "A",
-            10: "Bb",
-            11: "B",
-        }
-        oc = pitch // 12 - 1
+def convert_cached(
+    input_midi_path,
+    cache_dir=CACHE_DIR,
+    max_bytes=CACHE_MAX_BYTES,
+    parser="mido",
+):
+    """`convert_tables` backed by a cache keyed on the MIDI content hash.
 
-        _chou = df_hyousi_and_tempo[df_hyousi_and_tempo["時間"] <= t_note_on].iloc[-1][
-            "調"
-        ]
-        if _chou > 0:
-            pi_dict = pi_dict_sharp
-        elif _chou < 0:
-            pi_dict = pi_dict_flat
-        else:
-            pi_dict = pi_dict_normal
-
-        pi = pi_dict[pitch % 12]
-
-        notes_data.append(
-            [
-                t_note_on,
-                t_note_off,
-                hyousi_note_on,
-                hyousi_note_off,
-                t_zettai_note_on,
-                t_zettai_note_off,
-                oc,
-                pi,
-                pitch,
-                channel,
-            ]
-        )
+    Entries live in `cache_dir` as tables files (see `save_tables`) and are
+    loaded as memory maps. Hits refresh the entry's mtime and the least
+    recently used entries are removed beyond `max_bytes`.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{_cache_key(input_midi_path, parser)}.m2bt")
 
-    df_notes = pd.DataFrame(notes_data)
-    # channels = sorted(df_notes[9].unique()[:4])
-    # df_notes[9] = df_notes[9].apply(lambda c: channels.index(c))
-    df_notes.to_csv(output_note_path)
-
-    # ===== Texts =====
-    text_data = []
-    for _, row in df[df[2] == "Text_t"].iterrows():
-        t = int(row[1])
-        text = row[3]
-        t_zettai, hyousi = get_times_t_d(t)
-        text_data.append([t, t_zettai, get_time(t_zettai), hyousi, text])
-    pd.DataFrame(text_data).to_csv(output_text_path)
-
-    # ===== Markers =====
-    text_data = []
-    for _, row in df[df[2] == "Marker_t"].iterrows():
-        t = int(row[1])
-        text = row[3]
-        t_zettai, hyousi = get_times_t_d(t)
-        text_data.append([t, t_zettai, get_time(t_zettai), hyousi, text])
-    pd.DataFrame(text_data).to_csv(output_marker_path)
+    if os.path.exists(path):
+        try:
+            tables = load_tables(path)
+            os.utime(path)
+            return tables
+        except Exception as e:
+            print(f"Ignoring broken MIDI cache entry {path}: {e}")
+
+    tables = convert_tables(input_midi_path, parser)
+    save_tables(tables, path)
+    _evict_cache(cache_dir, max_bytes, path)
+    return tables
 
 
 if __name__ == "__main__":
@@ -320,9 +700,15 @@ if __name__ == "__main__":
         description="MIDI to CSV utility based on py_midicsv library"
     )
     parser.add_argument("-i", "--input", required=True, help="Input path")
+    parser.add_argument(
+        "--parser",
+        choices=["mido", "midicsv"],
+        default="mido",
+        help="MIDI reader (midicsv: legacy py_midicsv text round-trip)",
+    )
     args = parser.parse_args()
     try:
-        convert(args.input)
+        convert(args.input, parser=args.parser)
         print("Converted.")
     except Exception as e:
         print(e)
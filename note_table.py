@@ -0,0 +1,162 @@
+import bisect
+
+import numpy as np
+
+# Bar types; the names are the keys of the bar assets
+TYPE_NAMES = ("normal", "max", "min", "match", "match_all", "unmatch")
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+# Effect bitmask; the names are the keys of the icon assets
+EFFECT_NAMES = ("up", "down", "long")
+EFFECT_BITS = {name: 1 << i for i, name in enumerate(EFFECT_NAMES)}
+# Effect names of every bitmask value, in display order
+EFFECT_LISTS = tuple(
+    tuple(name for name, bit in EFFECT_BITS.items() if mask & bit)
+    for mask in range(1 << len(EFFECT_NAMES))
+)
+
+# Bar count categories, in the order of PassedNoteCounter counts
+COUNT_CATEGORIES = ("normal", "max", "min") + EFFECT_NAMES
+
+COLUMNS = {
+    "start": np.float64,
+    "end": np.float64,
+    "pitch": np.int64,
+    "pitch_org": np.float64,
+    "channel": np.int64,
+    "type": np.int8,
+    "effects": np.uint8,
+    # Layout in the page the note is drawn in
+    "x_start": np.float64,
+    "x_end": np.float64,
+    "width": np.float64,
+    "y": np.float64,
+    # Scoring against the mic notes
+    "match_ratio": np.float64,
+    "pitch_accuracy": np.float64,
+}
+
+
+class NoteTable:
+    """Notes stored as one NumPy array per column.
+
+    Columns are read as attributes (`table.start`, `table.pitch`, ...). They are
+    views of the first `len(table)` rows, so assignments such as
+    `table.end[-1] = t` or `table.y[rows] = ...` edit the table in place.
+    """
+
+    def __init__(self, capacity=0):
+        self._size = 0
+        self._data = {
+            column: np.zeros(capacity, dtype=dtype) for column, dtype in COLUMNS.items()
+        }
+
+    @classmethod
+    def from_columns(cls, **columns):
+        size = len(next(iter(columns.values())))
+        table = cls(size)
+        for column, values in columns.items():
+            table._data[column][:] = values
+        table._size = size
+        return table
+
+    def __len__(self):
+        return self._size
+
+    def __getattr__(self, name):
+        data = self.__dict__.get("_data")
+        if data is None or name not in data:
+            raise AttributeError(name)
+        return data[name][: self._size]
+
+    def append(self, **values):
+        if self._size == len(self._data["start"]):
+            capacity = max(16, self._size * 2)
+            for column, data in self._data.items():
+                grown = np.zeros(capacity, dtype=data.dtype)
+                grown[: self._size] = data[: self._size]
+                self._data[column] = grown
+
+        i = self._size
+        for data in self._data.values():
+            data[i] = 0
+        for column, value in values.items():
+            self._data[column][i] = value
+        self._size += 1
+
+    def clear(self):
+        self._size = 0
+
+    def sort(self, column="start"):
+        """Stable sort of the rows by `column`."""
+        order = np.argsort(getattr(self, column), kind="stable")
+        for data in self._data.values():
+            data[: self._size] = data[: self._size][order]
+
+    def rows(self, index, *columns):
+        """Tuples of Python scalars of `columns` for the rows selected by `index`."""
+        return zip(*(getattr(self, column)[index].tolist() for column in columns))
+
+
+def mask_to_slice(mask):
+    """Slice covering the True entries of `mask`, which must be contiguous."""
+    rows = np.flatnonzero(mask)
+    if len(rows) == 0:
+        return slice(0, 0)
+    return slice(int(rows[0]), int(rows[-1]) + 1)
+
+
+def count_categories(notes, rows, min_pitch, max_pitch):
+    """Matrix of the COUNT_CATEGORIES (0 or 1) of each note of `notes[rows]`"""
+    pitch = notes.pitch[rows]
+    effects = notes.effects[rows]
+    is_max = (pitch == max_pitch).astype(np.int64)
+    is_min = (pitch == min_pitch).astype(np.int64)
+    columns = [1 - is_max - is_min, is_max, is_min] + [
+        (effects & EFFECT_BITS[name] > 0).astype(np.int64) for name in EFFECT_NAMES
+    ]
+    return np.stack(columns, axis=1)
+
+
+class PassedNoteCounter:
+    """Counts per COUNT_CATEGORIES of the notes passed at a given time.
+
+    Notes are added in order of their pass time and the counts are kept as
+    prefix sums. A cursor follows playback; going back in time or jumping far
+    ahead falls back to bisect.
+    """
+
+    # Notes stepped through before falling back to bisect
+    MAX_STEPS = 4
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self.pass_times)
+
+    def clear(self):
+        self.pass_times = []
+        self.prefix = [np.zeros(len(COUNT_CATEGORIES), dtype=np.int64)]
+        self.cursor = 0
+
+    def extend(self, pass_times, categories):
+        for pass_time, category in zip(np.asarray(pass_times).tolist(), categories):
+            self.pass_times.append(pass_time)
+            self.prefix.append(self.prefix[-1] + category)
+
+    def counts(self, t):
+        pass_times = self.pass_times
+        k = self.cursor
+        if k > 0 and t < pass_times[k - 1]:
+            k = bisect.bisect_right(pass_times, t)
+        else:
+            steps = 0
+            while k < len(pass_times) and pass_times[k] <= t:
+                k += 1
+                steps += 1
+                if steps > self.MAX_STEPS:
+                    k = bisect.bisect_right(pass_times, t)
+                    break
+        self.cursor = k
+        return self.prefix[k]
@@ -0,0 +1,44 @@
+import bisect
+
+import numpy as np
+
+
+class PageIndex:
+    """Pages shown at a given time, i.e. fade_in_time <= t < fade_out_time.
+
+    The sorted fade boundaries split the song into segments with a fixed set
+    of pages. A cursor follows playback one segment at a time, and jumps such
+    as seeks fall back to bisect.
+    """
+
+    # Segments stepped through before falling back to bisect
+    MAX_STEPS = 4
+
+    def __init__(self, fade_in_times, fade_out_times):
+        fade_in_times = np.asarray(fade_in_times, dtype=np.float64)
+        fade_out_times = np.asarray(fade_out_times, dtype=np.float64)
+        self.boundaries = np.unique(
+            np.concatenate([fade_in_times, fade_out_times])
+        ).tolist()
+        # pages[k] is shown in [boundaries[k - 1], boundaries[k])
+        self.pages = [()] + [
+            tuple(np.flatnonzero((fade_in_times <= t) & (t < fade_out_times)).tolist())
+            for t in self.boundaries
+        ]
+        self.cursor = 0
+
+    def lookup(self, t):
+        boundaries = self.boundaries
+        k = self.cursor
+        if k > 0 and t < boundaries[k - 1]:
+            k = bisect.bisect_right(boundaries, t)
+        else:
+            steps = 0
+            while k < len(boundaries) and boundaries[k] <= t:
+                k += 1
+                steps += 1
+                if steps > self.MAX_STEPS:
+                    k = bisect.bisect_right(boundaries, t)
+                    break
+        self.cursor = k
+        return self.pages[k]
@@ -1,8 +1,22 @@
 import pygame
 import random
+import numpy as np
 
 from tools import draw_sparkle
 
+SPARKLE_COLORS = [
+    (255, 179, 186),
+    (255, 223, 186),
+    (255, 255, 186),
+    (186, 255, 201),
+    (186, 225, 255),
+    (219, 186, 255),
+    (255, 186, 245),
+    (255, 214, 255),
+    (214, 255, 255),
+    (255, 240, 200),
+]
+
 
 class Particle:
     """汎用キラキラパーティクル"""
@@ -16,20 +30,7 @@ class Particle:
         self.size = random.randint(*size_range)
         self.life_decay = life_decay
         if colors is None:
-            self.color = random.choice(
-                [
-                    (255, 179, 186),
-                    (255, 223, 186),
-                    (255, 255, 186),
-                    (186, 255, 201),
-                    (186, 225, 255),
-                    (219, 186, 255),
-                    (255, 186, 245),
-                    (255, 214, 255),
-                    (214, 255, 255),
-                    (255, 240, 200),
-                ]
-            )
+            self.color = random.choice(SPARKLE_COLORS)
         else:
             self.color = random.choice(colors)
 
@@ -57,3 +58,117 @@ class MicInputParticle(Particle):
             x, y, size_range=(5, 10), life_decay=0.05, colors=[(255, 255, 0)]
         )
         # 追加の初期化が必要ならここに記述
+
+
+class ParticleSystem:
+    """配列で管理するキラキラパーティクル群
+
+    Particle と同じ動きをまとめて更新し、描画は (サイズ, 色, アルファ段階)
+    ごとに事前描画したスプライトを blit する。capacity を超えた分は生成しない。
+    """
+
+    ALPHA_LEVELS = 16
+
+    def __init__(
+        self, capacity=2048, size_range=(2, 4), life_decay=0.02, colors=None, v=1
+    ):
+        self.capacity = capacity
+        self.defaults = {
+            "size_range": size_range,
+            "life_decay": life_decay,
+            "colors": colors,
+            "v": v,
+        }
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity)
+        self.life_decay = np.zeros(capacity)
+        self.size = np.zeros(capacity, dtype=np.int64)
+        self.color = np.zeros(capacity, dtype=np.int64)
+        self.palette = []
+        self.palette_index = {}
+        self.sprites = {}
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, x, y, **kwargs):
+        """Particle(x, y, ...) と同じ引数で 1 つ生成する"""
+        if self.count >= self.capacity:
+            return
+        params = {**self.defaults, **kwargs}
+        v = params["v"]
+        colors = params["colors"] if params["colors"] is not None else SPARKLE_COLORS
+
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = random.uniform(-v, v)
+        self.vy[i] = random.uniform(-v, v)
+        self.life[i] = 1.0
+        self.size[i] = random.randint(*params["size_range"])
+        self.life_decay[i] = params["life_decay"]
+        color = tuple(random.choice(colors))
+        if color not in self.palette_index:
+            self.palette_index[color] = len(self.palette)
+            self.palette.append(color)
+        self.color[i] = self.palette_index[color]
+        self.count += 1
+
+    def update(self):
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= self.life_decay[:n]
+
+        # Drop dead particles, keeping the order of the alive ones
+        alive = np.flatnonzero(self.life[:n] > 0)
+        if len(alive) < n:
+            for array in (
+                self.x,
+                self.y,
+                self.vx,
+                self.vy,
+                self.life,
+                self.life_decay,
+                self.size,
+                self.color,
+            ):
+                array[: len(alive)] = array[alive]
+            self.count = len(alive)
+
+    def get_sprite(self, size, color, level):
+        key = (size, color, level)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            alpha = level * 255 // (self.ALPHA_LEVELS - 1)
+            sprite = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+            draw_sparkle(sprite, (*self.palette[color], alpha), (size, size), size)
+            self.sprites[key] = sprite
+        return sprite
+
+    def draw(self, surface):
+        n = self.count
+        alpha = (np.clip(self.life[:n], 0, 1) * 255).astype(np.int64)
+        levels = (alpha * (self.ALPHA_LEVELS - 1) + 127) // 255
+        xs = (self.x[:n] - self.size[:n]).astype(np.int64)
+        ys = (self.y[:n] - self.size[:n]).astype(np.int64)
+        surface.blits(
+            [
+                (self.get_sprite(size, color, level), (x, y))
+                for size, color, level, x, y in zip(
+                    self.size[:n].tolist(),
+                    self.color[:n].tolist(),
+                    levels.tolist(),
+                    xs.tolist(),
+                    ys.tolist(),
+                )
+            ],
+            doreturn=False,
+        )
@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+# Pitch helpers taking either scalars or NumPy arrays. Scalars keep the exact
+# behavior (and return types) of the original helpers; arrays are computed with
+# NumPy ufuncs instead of a Python loop.
+
+
+def mod12(x):
+    """Pitch-class distance wrapped to (-6, 6]"""
+    if not isinstance(x, np.ndarray):
+        r = x % 12
+        if r > 6:
+            r -= 12
+        return r
+    r = np.mod(x, 12)
+    return np.where(r > 6, r - 12, r)
+
+
+def round_pitch(input_pitch, original_pitch, tolerance=0.5):
+    """`original_pitch` when within `tolerance`, otherwise the rounded input"""
+    if not isinstance(input_pitch, np.ndarray) and not isinstance(
+        original_pitch, np.ndarray
+    ):
+        if abs(input_pitch - original_pitch) <= tolerance:
+            return original_pitch
+        else:
+            return round(input_pitch)
+    return np.where(
+        np.abs(input_pitch - original_pitch) <= tolerance,
+        original_pitch,
+        np.round(input_pitch),
+    )
+
+
+def freq_to_midi(freq):
+    """MIDI note number of `freq` [Hz]; None (NaN in arrays) unless freq > 0"""
+    if freq is None:
+        return None
+    if not isinstance(freq, np.ndarray):
+        if freq <= 0:
+            return None
+        return 69.0 + 12.0 * math.log2(freq / 440.0)
+    freq = np.asarray(freq, dtype=np.float64)
+    midi = np.full(freq.shape, np.nan)
+    voiced = freq > 0
+    midi[voiced] = 69.0 + 12.0 * np.log2(freq[voiced] / 440.0)
+    return midi
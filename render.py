@@ -0,0 +1,55 @@
+import argparse
+import json
+import shutil
+import sys
+
+import mid2csv
+
+# Renders the video of a project file (see main_gui.py) without a display,
+# for batch jobs on servers. Exit status 0 when the video was written.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render the video of a project without a window"
+    )
+    parser.add_argument("project", help="Project file saved by main_gui.py")
+    parser.add_argument(
+        "-o", "--output", help="Output MP4 path (default: ./recordings/<date>.mp4)"
+    )
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg"):
+        print("ffmpeg was not found", file=sys.stderr)
+        sys.exit(2)
+
+    with open(args.project, encoding="utf-8") as f:
+        proj = json.load(f)
+
+    midi_tables = mid2csv.convert_cached(proj.get("mid_path"))
+    if len(midi_tables["marker"]["tick"]) < 2:
+        print("The MIDI file needs at least two markers", file=sys.stderr)
+        sys.exit(2)
+
+    # Imported here so that pygame starts after the checks above
+    from app import Mid2barPlayerApp
+
+    app = Mid2barPlayerApp(
+        audio_path=proj.get("audio_path"),
+        mid_path=proj.get("mid_path"),
+        lrc_path=proj.get("lrc_path"),
+        lrc_settings_path=proj.get("lrc_settings_path"),
+        video_paths=proj.get("video_paths", []),
+        video_fixed_fps=int(proj.get("video_fixed_fps", 0)),
+        video_shuffle=proj.get("video_shuffle", False),
+        credit_text=proj.get("splash_text"),
+        splash_image=proj.get("splash_image"),
+        title_image=proj.get("title_image"),
+        mic_input_channel=int(proj.get("mic_input_channel", 0)),
+        record=True,
+        record_path=args.output,
+        headless=True,
+        settings_json_path=proj.get("settings_json_path")
+        or "app_settings/settings.json",
+        assets_json_path=proj.get("assets_json_path") or "app_settings/assets.json",
+    )
+    sys.exit(app.run())
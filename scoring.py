@@ -0,0 +1,196 @@
+import bisect
+
+import numpy as np
+
+from note_table import NoteTable, mask_to_slice
+
+
+def split_pages(notes, separator_times, hide_empty=False):
+    """Pages between consecutive separator times, with the rows of their notes"""
+    pages = []
+    starts = notes.start
+    for start_time, end_time in zip(separator_times[:-1], separator_times[1:]):
+        # Notes are sorted by start, so the notes of a page are contiguous
+        rows = mask_to_slice(
+            (start_time - 1e-5 <= starts)
+            & (starts < end_time)
+            & (end_time - starts >= 1e-5)
+        )
+        if hide_empty and rows.stop == rows.start:
+            continue
+        pages.append({"start_time": start_time, "end_time": end_time, "notes": rows})
+    return pages
+
+
+def mic_page_rows(mic_notes, start_time, end_time):
+    """Rows of the mic notes overlapping [start_time, end_time]"""
+    # Mic notes never overlap, so they are sorted by both start and end
+    lo = int(np.searchsorted(mic_notes.end, start_time, side="left"))
+    hi = int(np.searchsorted(mic_notes.start, end_time, side="right"))
+    return slice(lo, max(lo, hi))
+
+
+class PageScoreEngine:
+    """Page scores of the mic notes against the notes of one channel.
+
+    Page scores are cached and a page is only scored again when one of the mic
+    notes in its range changed (`invalidate_from`). The matcher only appends
+    mic notes or extends the last one, so this is the page being sung and
+    sometimes the previous one. The total over the pages that ended before the
+    current time is kept as a running sum, and cursors on the pages follow the
+    current time, so the scores shown every frame are looked up directly.
+    """
+
+    def __init__(self, notes, pages, channel, pitch_match_ratio, pitch_accuracy_ratio):
+        self.notes = notes
+        self.pages = pages
+        self.pitch_match_ratio = pitch_match_ratio
+        self.pitch_accuracy_ratio = pitch_accuracy_ratio
+        self.rows = [
+            page["notes"].start
+            + np.flatnonzero(notes.channel[page["notes"]] == channel)
+            for page in pages
+        ]
+        self.start_times = [page["start_time"] for page in pages]
+        self.end_times = [page["end_time"] for page in pages]
+        # Last page with notes before page i, or -1
+        self.last_scored = []
+        last = -1
+        for i, rows in enumerate(self.rows):
+            self.last_scored.append(last)
+            if len(rows) > 0:
+                last = i
+        self.last_scored.append(last)
+        self.reset()
+
+    def reset(self):
+        empty = NoteTable()
+        self.page_scores = [
+            self.score_page(i, empty, slice(0, 0)) for i in range(len(self.pages))
+        ]
+        # Mic notes from this index on changed since the last update
+        self.dirty_from = 0
+        # Pages [0, passed) ended before the current time
+        self.passed = 0
+        self.passed_total = 0.0
+        self.passed_count = 0
+        # First page that did not end at or before the current time
+        self.now = 0
+        self.now_time = 0.0
+        self.last_update_time = None
+
+    def invalidate_from(self, index):
+        self.dirty_from = min(self.dirty_from, index)
+
+    def update(self, mic_notes, mic_pages, t):
+        first = self.dirty_from
+        if first < len(mic_notes) and len(mic_pages) == len(self.pages):
+            last_end = mic_notes.end[-1]
+            i = bisect.bisect_left(self.end_times, mic_notes.start[first])
+            while i < len(self.pages) and self.start_times[i] <= last_end:
+                mic_rows = mic_pages[i]["notes"]
+                if mic_rows.start < mic_rows.stop and first < mic_rows.stop:
+                    self.set_page_score(i, self.score_page(i, mic_notes, mic_rows))
+                i += 1
+            self.dirty_from = len(mic_notes)
+
+        self.advance(t)
+        self.last_update_time = t
+
+    def set_page_score(self, i, score):
+        if i < self.passed and score["number_of_notes"] > 0:
+            self.passed_total += (
+                score["weighted_score"] - self.page_scores[i]["weighted_score"]
+            )
+        self.page_scores[i] = score
+
+    def advance(self, t):
+        """Move the running total to the pages that ended before `t`"""
+        while self.passed < len(self.pages) and self.end_times[self.passed] < t:
+            score = self.page_scores[self.passed]
+            if score["number_of_notes"] > 0:
+                self.passed_total += score["weighted_score"]
+                self.passed_count += 1
+            self.passed += 1
+        while self.passed > 0 and self.end_times[self.passed - 1] >= t:
+            self.passed -= 1
+            score = self.page_scores[self.passed]
+            if score["number_of_notes"] > 0:
+                self.passed_total -= score["weighted_score"]
+                self.passed_count -= 1
+
+        while self.now < len(self.pages) and self.end_times[self.now] <= t:
+            self.now += 1
+        while self.now > 0 and self.end_times[self.now - 1] > t:
+            self.now -= 1
+        self.now_time = t
+
+    def total_score(self):
+        """Mean weighted score of the pages with notes that ended"""
+        if self.passed_count == 0:
+            return 0.0
+        return self.passed_total / self.passed_count
+
+    def page_score(self):
+        """Weighted score of the last page with notes that ended"""
+        i = self.last_scored[self.passed]
+        return self.page_scores[i]["weighted_score"] if i >= 0 else 0.0
+
+    def now_score(self):
+        """Weighted score of the page at the current time"""
+        i = self.now
+        if i < len(self.pages) and self.start_times[i] <= self.now_time:
+            return self.page_scores[i]["weighted_score"]
+        return 0.0
+
+    def score_page(self, i, mic_notes, mic_rows):
+        notes = self.notes
+        rows = self.rows[i]
+        page = self.pages[i]
+
+        mic_abs_diff = np.abs(mic_notes.pitch_org[mic_rows] - mic_notes.pitch[mic_rows])
+        mic_score_raw = np.where(mic_abs_diff >= 6.0, 0.0, (6.0 - mic_abs_diff) / 6.0)
+
+        # Overlap of every (note, mic note) pair of the page
+        n_start = notes.start[rows][:, None]
+        n_end = notes.end[rows][:, None]
+        overlap = np.minimum(n_end, mic_notes.end[mic_rows]) - np.maximum(
+            n_start, mic_notes.start[mic_rows]
+        )
+        overlap = np.maximum(overlap, 0.0)
+        total_overlap = overlap.sum(axis=1)
+
+        equal_mask = mic_notes.pitch[mic_rows] == notes.pitch[rows][:, None]
+        equal_time = (overlap * equal_mask).sum(axis=1)
+        weighted_score = (overlap * mic_score_raw).sum(axis=1)
+
+        note_duration = np.maximum(0.0, notes.end[rows] - notes.start[rows])
+        scored = (note_duration > 0.0) & (total_overlap > 0.0)
+        match_ratio = np.zeros(len(rows))
+        pitch_accuracy = np.zeros(len(rows))
+        match_ratio[scored] = equal_time[scored] / note_duration[scored]
+        pitch_accuracy[scored] = np.clip(
+            weighted_score[scored] / total_overlap[scored], 0.0, 1.0
+        )
+        notes.match_ratio[rows] = match_ratio
+        notes.pitch_accuracy[rows] = pitch_accuracy
+
+        if len(rows) > 0:
+            score_pitch_match = np.average(match_ratio, weights=note_duration) * 100
+            score_pitch_accuracy = (
+                np.average(pitch_accuracy, weights=note_duration) * 100
+            )
+        else:
+            score_pitch_match = 0.0
+            score_pitch_accuracy = 0.0
+
+        return {
+            "number_of_notes": len(rows),
+            "start_time": page["start_time"],
+            "end_time": page["end_time"],
+            "duration": page["end_time"] - page["start_time"],
+            "pitch_match": score_pitch_match,
+            "pitch_accuracy": score_pitch_accuracy,
+            "weighted_score": self.pitch_match_ratio * score_pitch_match
+            + self.pitch_accuracy_ratio * score_pitch_accuracy,
+        }
@@ -121,11 +121,13 @@ class SettingsSchema:
     # ===== 採点 =====
     PITCH_MATCH_SCORE_RATIO: float = 0.3
     PITCH_ACCURACY_SCORE_RATIO: float = 0.7
+    SCORE_UPDATE_INTERVAL: float = 0.0
 
     # ===== FFT / マイク =====
     RMS_THRESHOLD: float = 0.02
     MIC_INPUT_DURATION: float = 0.0
     MIC_INPUT_DELAY: float = 0.17
+    # 半音単位。PITCH_ESTIMATOR が "peak" のときだけ加算
     MIC_INPUT_OFFSET: float = 0.2
     MIC_INPUT_PITCH_TOLERANCE: float = 0.8
     MIC_INPUT_NOTE_CONNECT_DURATION: float = 0.1
@@ -133,6 +135,8 @@ class SettingsSchema:
 
     DEFAULT_SAMPLE_RATE: int = 44100
     DEFAULT_BLOCK_SIZE: int = 4096
+    DEFAULT_HOP_SIZE: int = 1024
+    PITCH_ESTIMATOR: str = "peak"
     DEFAULT_CHANNELS: int = 1
 
     NOTE_NAMES: Tuple[str, ...] = (
@@ -155,3 +159,6 @@ class SettingsSchema:
     AUDIO_BPS: str = "320k"
     VIDEO_CODEC: str = "h264_nvenc"
     VIDEO_BPS: str = "10M"
+
+    # ===== デバッグ =====
+    EXPORT_DEBUG_CSV: bool = False
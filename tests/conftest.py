@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+
+import pygame
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Settings, languages and samples are loaded relative to the repository
+os.chdir(ROOT)
+
+SAMPLE = os.path.join(ROOT, "sample", "【音楽：魔王魂】シャイニングスター（ショート）")
+
+
+def with_root(node):
+    """Asset paths of assets.json, made absolute"""
+    if isinstance(node, str):
+        return os.path.join(ROOT, node)
+    if isinstance(node, dict):
+        return {key: with_root(value) for key, value in node.items()}
+    return [with_root(value) for value in node]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Settings for a run from tmp_path, where the caches and lyrics go"""
+    # The Noto Sans fonts are not in the repository, use the one of pygame
+    font = os.path.join(
+        os.path.dirname(pygame.__file__), pygame.font.get_default_font()
+    )
+    with open(os.path.join(ROOT, "app_settings/settings.json"), encoding="utf-8") as f:
+        settings = json.load(f)
+    settings["UI_FONT"] = settings["BAR_COUNT_FONT"] = font
+    (tmp_path / "settings.json").write_text(json.dumps(settings), encoding="utf-8")
+
+    with open(
+        os.path.join(ROOT, "lyrics_settings/settings_default.json"), encoding="utf-8"
+    ) as f:
+        lyrics_settings = json.load(f)
+    for section in lyrics_settings.values():
+        if "FONT_PATH" in section:
+            section["FONT_PATH"] = font
+    (tmp_path / "lyrics_settings.json").write_text(
+        json.dumps(lyrics_settings), encoding="utf-8"
+    )
+
+    with open(os.path.join(ROOT, "app_settings/assets.json"), encoding="utf-8") as f:
+        assets = with_root(json.load(f))
+    (tmp_path / "assets.json").write_text(json.dumps(assets), encoding="utf-8")
+
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    # The app loads its icons next to main.py
+    monkeypatch.setattr(sys, "argv", [os.path.join(ROOT, "main.py")])
+    return tmp_path
+
+
+@pytest.fixture
+def make_player(workdir):
+    """Factory of headless players on the sample song, run from `workdir`"""
+    from app import Mid2barPlayerApp
+
+    def make(mid_path=SAMPLE + ".mid", **kwargs):
+        return Mid2barPlayerApp(
+            SAMPLE + "_inst.mp3",
+            mid_path,
+            SAMPLE + ".lrc",
+            str(workdir / "lyrics_settings.json"),
+            splash_image=os.path.join(ROOT, "images/title/splash.png"),
+            title_image=os.path.join(ROOT, "images/title/シャイニングスター.png"),
+            headless=True,
+            settings_json_path=str(workdir / "settings.json"),
+            assets_json_path=str(workdir / "assets.json"),
+            **kwargs,
+        )
+
+    yield make
+    pygame.quit()
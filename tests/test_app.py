@@ -0,0 +1,45 @@
+import mido
+import numpy as np
+
+import mid2csv
+from app import EFFECT_BITS
+from conftest import SAMPLE
+
+
+def split_channels(src_path, dst_path):
+    """The sample as a type 1 file, with a track per channel"""
+    src = mido.MidiFile(src_path)
+    out = mido.MidiFile(type=1, ticks_per_beat=src.ticks_per_beat)
+    tracks = [mido.MidiTrack() for _ in range(3)]
+    last_times = [0] * len(tracks)
+    abs_time = 0
+    for msg in src.tracks[0]:
+        abs_time += msg.time
+        i = 0 if msg.is_meta else 1 + msg.channel
+        tracks[i].append(msg.copy(time=abs_time - last_times[i]))
+        last_times[i] = abs_time
+    out.tracks.extend(tracks)
+    out.save(dst_path)
+
+
+def test_effects_follow_file_order(workdir, make_player):
+    mid_path = str(workdir / "split.mid")
+    split_channels(SAMPLE + ".mid", mid_path)
+    notes = mid2csv.convert_tables(mid_path)["note"]
+    assert np.any(np.diff(notes["start"]) < 0)
+
+    # Jumps between neighbours of note.csv, which runs track by track
+    pitch_range = notes["pitch"].max() - notes["pitch"].min()
+    pitch_diffs = np.diff(notes["pitch"])
+    durations = notes["end"] - notes["start"]
+    expected = np.zeros(len(durations), dtype=np.uint8)
+    expected[:-1][pitch_diffs >= pitch_range / 2] |= EFFECT_BITS["up"]
+    expected[:-1][pitch_diffs <= -pitch_range / 2] |= EFFECT_BITS["down"]
+    expected[durations > np.percentile(durations, 90)] |= EFFECT_BITS["long"]
+
+    app = make_player(mid_path)
+
+    order = np.argsort(notes["start"], kind="stable")
+    assert np.all(np.diff(app.notes.start) >= 0)
+    np.testing.assert_array_equal(app.notes.pitch, notes["pitch"][order])
+    np.testing.assert_array_equal(app.notes.effects, expected[order])
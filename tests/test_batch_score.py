@@ -0,0 +1,58 @@
+import wave
+
+import numpy as np
+import pytest
+
+from batch_score import Song
+from conftest import SAMPLE
+
+CHANNEL = 0
+
+
+def synth_take(notes, duration, path, sample_rate=44100):
+    """A harmonic tone on the notes of CHANNEL, sung a bit flat with vibrato"""
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    midi = np.full(len(t), np.nan)
+    rows = np.flatnonzero(notes.channel == CHANNEL)
+    for start, end, pitch in zip(notes.start[rows], notes.end[rows], notes.pitch[rows]):
+        midi[int(start * sample_rate) : int(end * sample_rate)] = pitch - 0.3
+    midi += 0.4 * np.sin(2 * np.pi * 5.5 * t)
+    freq = np.where(np.isnan(midi), 0.0, 440.0 * 2 ** ((midi - 69) / 12))
+    phase = 2 * np.pi * np.cumsum(freq) / sample_rate
+    signal = sum(np.sin(k * phase) / k for k in range(1, 5)) * (freq > 0)
+    signal *= 0.2 / np.max(np.abs(signal))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((signal * 32767).astype(np.int16).tobytes())
+
+
+def test_cli_scores_equal_player_replay(workdir, make_player):
+    song = Song(SAMPLE + ".mid", CHANNEL, str(workdir / "settings.json"))
+    wav_path = str(workdir / "take.wav")
+
+    app = make_player(mic_input_channel=CHANNEL)
+    synth_take(app.notes, app.song_duration, wav_path)
+    app.enable_mic_input = True
+    app.mic_replay_path = wav_path
+    app.detector = app.create_detector()
+
+    # The frames of render(), with the mic steps of draw() and run()
+    fps = app.s.SCREEN_FPS
+    frame_index = 0
+    while frame_index / fps < app.song_duration:
+        app.current_time = frame_index / fps
+        if app.current_time > app.s.DISPLAY_TITLE_DURATION:
+            app.update_mic_inputs()
+            app.update_mic_notes()
+            app.calc_pages_mic()
+        app.compute_note_scores()
+        frame_index += 1
+
+    result = song.score(wav_path, duration=app.song_duration)
+
+    assert 0 < result["score"] < 100
+    assert result["pages"] == app.score_engine.page_scores
+    # The player keeps a running sum, which may round differently
+    assert result["score"] == pytest.approx(app.score_engine.total_score())
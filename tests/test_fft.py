@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+import fft
+
+SAMPLE_RATE = 44100
+BLOCK_SIZE = 4096
+
+
+def harmonic_frames(freq, amplitudes, n_frames=8):
+    rng = np.random.default_rng(0)
+    t = np.arange(BLOCK_SIZE * n_frames) / SAMPLE_RATE
+    signal = sum(
+        a * np.sin(2 * np.pi * k * freq * t + rng.uniform(0, 2 * np.pi))
+        for k, a in enumerate(amplitudes, start=1)
+    )
+    signal = 0.2 * signal / np.max(np.abs(signal))
+    signal += 0.002 * rng.standard_normal(len(signal))
+    return signal.reshape(n_frames, BLOCK_SIZE)
+
+
+@pytest.mark.parametrize("name", sorted(fft.ESTIMATORS))
+@pytest.mark.parametrize(
+    "amplitudes",
+    [[1.0], [1.0 / k for k in range(1, 9)], [0.3, 1.0, 0.8, 0.5, 0.3, 0.2]],
+    ids=["sine", "harmonic", "weak fundamental"],
+)
+@pytest.mark.parametrize("midi", [45, 57, 64, 76])
+def test_estimators_find_the_fundamental(name, amplitudes, midi):
+    if name == "peak" and amplitudes[0] < max(amplitudes):
+        pytest.skip("the strongest bin is the 2nd harmonic")
+    estimator = fft.ESTIMATORS[name](SAMPLE_RATE, BLOCK_SIZE)
+    freq, _ = estimator.estimate(
+        harmonic_frames(440.0 * 2 ** ((midi - 69) / 12), amplitudes)
+    )
+    np.testing.assert_allclose(fft.freq_to_midi(freq), midi, atol=0.1)
+
+
+def test_estimator_must_implement_estimate():
+    with pytest.raises(TypeError):
+        fft.SpectrumEstimator(SAMPLE_RATE, BLOCK_SIZE)
+
+
+@pytest.mark.parametrize("name", sorted(fft.ESTIMATORS))
+def test_mic_input_offset_only_shifts_the_peak_estimator(name, tmp_path):
+    with open("app_settings/settings.json", encoding="utf-8") as f:
+        settings = json.load(f)
+    settings["PITCH_ESTIMATOR"] = name
+    settings_path = tmp_path / "settings.json"
+    settings_path.write_text(json.dumps(settings), encoding="utf-8")
+
+    detector = fft.RealtimeFFTPitchDetector(str(settings_path))
+    result = detector._describe(fft.PitchSnapshot(freq=440.0))
+    offset = settings["MIC_INPUT_OFFSET"] if name == "peak" else 0.0
+    assert result["midi"] == pytest.approx(69 + offset)
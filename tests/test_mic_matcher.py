@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+
+from mic_matcher import MicNoteMatcher, split_range
+from mic_samples import MicSampleBuffer
+from note_table import NoteTable
+
+
+def make_matcher(start, end, pitch, samples):
+    notes = NoteTable.from_columns(
+        start=start, end=end, pitch=pitch, channel=np.zeros(len(start))
+    )
+    mic_notes = NoteTable()
+    matcher = MicNoteMatcher(
+        notes,
+        np.arange(len(notes)),
+        samples,
+        mic_notes,
+        channel=0,
+        margin=0.01,
+        connect_duration=0.1,
+        tolerance=0.8,
+    )
+    return matcher, mic_notes
+
+
+def test_split_range():
+    assert split_range(1.0, 1.25, 0.1) == [(1.0, 1.1), (1.1, 1.25)]
+    assert split_range(1.0, 1.05, 0.1) == [(1.0, 1.05)]
+    assert split_range(1.0, 1.0, 0.1) == []
+    assert split_range(1.0, 0.5, 0.1) == []
+
+
+def test_zero_length_note_is_skipped():
+    samples = MicSampleBuffer()
+    for t in np.arange(0.0, 2.0, 0.02):
+        samples.append(t, 60.0, 0.1)
+    matcher, mic_notes = make_matcher(
+        start=[0.5, 1.0, 1.2], end=[0.8, 1.0, 1.5], pitch=[60, 62, 60], samples=samples
+    )
+
+    matcher.update(math.inf)
+
+    assert matcher.cursor == 3
+    np.testing.assert_allclose(mic_notes.start, [0.5, 1.2])
+    np.testing.assert_allclose(mic_notes.end, [0.8, 1.5])
+    assert mic_notes.pitch.tolist() == [60, 60]
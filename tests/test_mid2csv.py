@@ -0,0 +1,28 @@
+import os
+import time
+
+import mid2csv
+
+SAMPLE = "sample/【音楽：魔王魂】シャイニングスター（ショート）"
+
+
+def test_convert_cached_hits(tmp_path):
+    tables = mid2csv.convert_cached(SAMPLE + ".mid", cache_dir=str(tmp_path))
+    cached = mid2csv.convert_cached(SAMPLE + ".mid", cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+    for name, table in tables.items():
+        for column, values in table.items():
+            assert list(cached[name][column]) == list(values)
+
+
+def test_evict_cache_removes_least_recently_used(tmp_path):
+    old, used, new = (tmp_path / f"{name}.m2bt" for name in ("old", "used", "new"))
+    for age, path in zip((60, 30, 60), (old, used, new)):
+        path.write_bytes(b"\0" * 100)
+        os.utime(path, (time.time() - age, time.time() - age))
+
+    mid2csv._evict_cache(str(tmp_path), 200, str(new))
+
+    assert not old.exists()
+    assert used.exists()
+    assert new.exists()
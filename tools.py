@@ -3,7 +3,7 @@ import os
 import sys
 import json
 import pygame
-import numpy as np
+from collections import OrderedDict
 
 if os.path.exists("project.json"):
     with open("project.json", "r", encoding="utf-8") as f:
@@ -96,6 +96,7 @@ def blit_with_alpha(target, source, pos, crop_rect=None, alpha=1.0):
 
 def render_outlined_text(text, font, text_color, outline_color, outline_width=2):
     base = font.render(text, True, text_color)
+    outline_text = font.render(text, True, outline_color)
 
     outline = pygame.Surface(
         (base.get_width() + outline_width * 2, base.get_height() + outline_width * 2),
@@ -105,13 +106,59 @@ def render_outlined_text(text, font, text_color, outline_color, outline_width=2)
         for dy in range(-outline_width, outline_width + 1):
             if dx * dx + dy * dy <= outline_width * outline_width:
                 pos = (dx + outline_width, dy + outline_width)
-                outline.blit(font.render(text, True, outline_color), pos)
+                outline.blit(outline_text, pos)
 
     outline.blit(base, (outline_width, outline_width))
 
     return outline
 
 
+class SurfaceCache:
+    """LRU cache of rendered surfaces.
+
+    Returned surfaces are shared between callers and must not be modified.
+    `hits` and `misses` count the lookups (a miss renders the surface).
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = render()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class TextSurfaceCache(SurfaceCache):
+    """Rendered text surfaces keyed on (font, text, color, outline)"""
+
+    def render(self, font, text, color):
+        return self.get(
+            (font, text, tuple(color), None),
+            lambda: font.render(text, True, color),
+        )
+
+    def render_outlined(self, font, text, text_color, outline_color, outline_width=2):
+        return self.get(
+            (font, text, tuple(text_color), (tuple(outline_color), outline_width)),
+            lambda: render_outlined_text(
+                text, font, text_color, outline_color, outline_width
+            ),
+        )
+
+
 def draw_sparkle(surface, color, center, radius, inner_ratio=0.35):
     cx, cy = center
     verts = [
@@ -127,33 +174,6 @@ def draw_sparkle(surface, color, center, radius, inner_ratio=0.35):
     pygame.draw.polygon(surface, color, verts)
 
 
-def round_pitch(input_pitch, original_pitch, tolerance=0.5):
-    if abs(input_pitch - original_pitch) <= tolerance:
-        return original_pitch
-    else:
-        return round(input_pitch)
-
-
-def mod12_custom(x):
-    r = x % 12
-    if r > 6:
-        r -= 12
-    return r
-
-
-def split_range(A, B, step):
-    # 区間の端の候補を作成
-    edges = np.arange(A, B, step)
-    if edges[-1] < B:
-        edges = np.append(edges, B)
-
-    if len(edges) >= 3 and (edges[-1] - edges[-2]) < step:
-        edges = np.delete(edges, -2)
-
-    intervals = list(zip(edges[:-1], edges[1:]))
-    return intervals
-
-
 def bezier3(p0, p1, p2, p3, t):
     u = 1 - t
     x = (
@@ -212,3 +232,48 @@ def resource_path(relative_path):
         # 通常 / onedir
         base_path = os.path.dirname(os.path.abspath(sys.argv[0]))
     return os.path.join(base_path, relative_path)
+
+
+class BarSurfaceCache(SurfaceCache):
+    """Bars of `draw_stretchable_rounded_rect` composited once per image set and width.
+
+    A bar is drawn into its own surface at the sub-pixel offset it has on
+    the screen, so blitting the cached bar puts every part on the same
+    pixels as drawing the parts directly. `draw` returns the blitted rect.
+    """
+
+    def draw(self, screen, x, y, width, height, left_img, mid_img, right_img, padding):
+        bar_lr_w = left_img.get_width() - padding
+        if width >= bar_lr_w * 2:
+            left = x - padding
+        else:
+            scale = width / (bar_lr_w * 2)
+            left = x - padding * scale
+        top = y - padding
+        origin = (math.floor(left), math.floor(top))
+        local_x = x - origin[0]
+        local_y = y - origin[1]
+
+        def render():
+            surface = pygame.Surface(
+                (
+                    math.ceil(left - origin[0] + width + padding * 2) + 1,
+                    mid_img.get_height() + 1,
+                ),
+                pygame.SRCALPHA,
+            )
+            draw_stretchable_rounded_rect(
+                surface,
+                local_x,
+                local_y,
+                width,
+                height,
+                left_img,
+                mid_img,
+                right_img,
+                padding,
+            )
+            return surface
+
+        key = (left_img, mid_img, right_img, padding, width, local_x, local_y)
+        return screen.blit(self.get(key, render), origin)
@@ -62,7 +62,7 @@ class VideoPlayer:
             return None, None
 
         if self.start_time is None:
-            self.start_time = time.time()
+            self.start_time = current_time if current_time is not None else time.time()
 
         elapsed = (
             current_time if current_time is not None else time.time()